@@ -0,0 +1,411 @@
+# Timing checks for gamebox and game.py hot paths.
+# Run with: python benchmarks.py  (uses SDL's dummy video driver, so no window opens)
+
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import random
+import timeit
+
+import gamebox
+
+
+def report(name, seconds, count):
+    """prints how long one of count operations took, in microseconds"""
+    print('%-50s %12.3f us' % (name, seconds / count * 1e6))
+
+
+def bench_edge_access(count=200000):
+    """reading and writing SpriteBox edges, and touches() between two boxes"""
+    a = gamebox.from_color(100, 100, "red", 30, 30)
+    b = gamebox.from_color(110, 110, "blue", 30, 30)
+    a.hp = 3
+    report('SpriteBox.left read', timeit.timeit(lambda: a.left, number=count), count)
+    report('SpriteBox.left + right + top + bottom', timeit.timeit(lambda: (a.left, a.right, a.top, a.bottom),
+                                                                  number=count), count)
+
+    def write():
+        a.left = 5
+
+    report('SpriteBox.left write', timeit.timeit(write, number=count), count)
+    report('SpriteBox custom attribute read', timeit.timeit(lambda: a.hp, number=count), count)
+    report('SpriteBox.touches', timeit.timeit(lambda: a.touches(b), number=count), count)
+
+
+def bench_colors(count=200000):
+    """setting a box's color by name, which used to parse the name every time, and filling with it"""
+    import pygame
+    box = gamebox.from_color(100, 100, "red", 30, 30)
+
+    def set_color():
+        box.color = "purple"
+
+    report('SpriteBox.color = "purple"', timeit.timeit(set_color, number=count), count)
+    report('pygame.Color("purple") (parsing a name)', timeit.timeit(lambda: pygame.Color("purple"), number=count),
+           count)
+    surface = pygame.Surface((400, 600))
+    color = gamebox.get_color("purple")
+    report('Surface.fill with a Color', timeit.timeit(lambda: surface.fill(color, (10, 10, 5, 5)), number=count),
+           count)
+    mapped = surface.map_rgb(color)
+    report('Surface.fill with a mapped int', timeit.timeit(lambda: surface.fill(mapped, (10, 10, 5, 5)),
+                                                          number=count), count)
+
+
+def bench_bullet_hits(enemy_count=600, bullet_count=100, rounds=20):
+    """one tick's worth of bullet-vs-enemy tests: every pair versus a SpatialGrid rebuilt each time"""
+    rng = random.Random(0)
+    enemies = [gamebox.from_color(rng.randint(0, 400), rng.randint(-3000, 600), "green", 30, 30)
+               for _ in range(enemy_count)]
+    bullets = [gamebox.from_color(rng.randint(0, 400), rng.randint(0, 600), "white", 5, 5)
+               for _ in range(bullet_count)]
+
+    def every_pair():
+        return sum(1 for bullet in bullets for enemy in enemies if bullet.touches(enemy))
+
+    grid = gamebox.SpatialGrid(60)
+
+    def with_grid():
+        grid.rebuild(enemies)
+        return sum(len(grid.touching(bullet)) for bullet in bullets)
+
+    if every_pair() != with_grid(): raise Exception("grid and every-pair hits disagree")
+    name = '%d enemies x %d bullets' % (enemy_count, bullet_count)
+    report(name + ', every pair', timeit.timeit(every_pair, number=rounds), rounds)
+    report(name + ', SpatialGrid', timeit.timeit(with_grid, number=rounds), rounds)
+
+
+def bench_movers(count=1000, rounds=50):
+    """one tick of sine-wave mover enemies: the old per-box math.sin timers versus a MotionGroup"""
+    import math
+    rng = random.Random(0)
+    specs = [(rng.randint(0, 400), rng.randint(-2000, 600), 50, 50, rng.choice((80, 96, 120)),
+              rng.choice((80, 96, 120)), i % 40, i % 40 + 30) for i in range(count)]
+    old = []
+    for x, y, xa, ya, xp, yp, xph, yph in specs:
+        box = gamebox.from_color(x, y, "green", 30, 30)
+        box.x_move_timer, box.y_move_timer = 0, 0
+        box.x_amplitude, box.y_amplitude, box.x_period, box.y_period = xa, ya, xp, yp
+        box.x_phase, box.y_phase, box.x_init, box.y_init = xph, yph, x, y
+        old.append(box)
+
+    def per_box():
+        for enemy in old:
+            enemy.x = enemy.x_amplitude * math.sin(2 * math.pi / enemy.x_period * enemy.x_move_timer -
+                                                   enemy.x_phase) + enemy.x_init
+            enemy.y = enemy.y_amplitude * math.sin(2 * math.pi / enemy.y_period * enemy.y_move_timer -
+                                                   enemy.y_phase) + enemy.y_init
+            enemy.x_move_timer += 1
+            enemy.y_move_timer += 1
+            if enemy.x_move_timer == enemy.x_period:
+                enemy.x_move_timer = 0
+            if enemy.y_move_timer == enemy.y_period:
+                enemy.y_move_timer = 0
+
+    group = gamebox.MotionGroup()
+    for spec in specs:
+        group.add(gamebox.from_color(spec[0], spec[1], "green", 30, 30), gamebox.lissajous_path(*spec))
+    report('%d movers, math.sin per box' % count, timeit.timeit(per_box, number=rounds), rounds)
+    report('%d movers, MotionGroup.step' % count, timeit.timeit(group.step, number=rounds), rounds)
+    report('%d movers, MotionGroup.positions only' % count, timeit.timeit(group.positions, number=rounds), rounds)
+
+
+def bench_entity_pool(bullet_count=5000, enemy_count=600, rounds=20):
+    """one frame of bullet-hell bookkeeping in an EntityPool: move, cull off-screen, and find bullet-enemy hits"""
+    rng = random.Random(0)
+    bullets = gamebox.EntityPool(['pierce'], bullet_count)
+    for _ in range(bullet_count):
+        bullets.add(rng.uniform(0, 400), rng.uniform(0, 600), 5, 5, "white", rng.uniform(-3, 3), -10, pierce=1)
+    enemies = gamebox.EntityPool(['hp'], enemy_count)
+    for _ in range(enemy_count):
+        enemies.add(rng.uniform(0, 400), rng.uniform(-3000, 600), 30, 30, "green", hp=1)
+
+    def frame():
+        bullets.move_speed_all()
+        bullets.outside_mask(0, -600, 400, 600)
+        return len(enemies.overlaps(bullets))
+
+    report('%d bullets in an EntityPool, one frame' % bullet_count, timeit.timeit(frame, number=rounds), rounds)
+
+
+def bench_clear_enemy_wall(columns=14, rows=15, rounds=50):
+    """removing a fully killed wall of enemies: list.remove while looping (repeated until the list is empty, since it
+    skips the box after each removal) versus kill() and one remove_dead pass"""
+
+    def make_wall():
+        wall = []
+        for i in range(columns):
+            for j in range(rows):
+                enemy = gamebox.from_color(15 + 30 * i, -2560 - 30 * j, "yellow", 30, 30)
+                enemy.hp = 0
+                wall.append(enemy)
+        return wall
+
+    def remove_while_looping(wall):
+        passes = 0
+        while wall:
+            passes += 1
+            for enemy in wall:
+                if enemy.hp <= 0:
+                    wall.remove(enemy)
+        return passes
+
+    def kill_and_compact(wall):
+        for enemy in wall:
+            if enemy.hp <= 0:
+                enemy.kill()
+        gamebox.remove_dead(wall)
+
+    walls = [make_wall() for _ in range(rounds)]
+    passes = remove_while_looping(make_wall())
+    name = '%d-enemy wall, list.remove (%d passes)' % (columns * rows, passes)
+    report(name, timeit.timeit(lambda: remove_while_looping(walls.pop()), number=rounds), rounds)
+    walls = [make_wall() for _ in range(rounds)]
+    report('%d-enemy wall, kill + remove_dead' % (columns * rows),
+           timeit.timeit(lambda: kill_and_compact(walls.pop()), number=rounds), rounds)
+
+
+def bench_score_text(count=2000):
+    """rendering a score that changes every tick: a new font and full render each time versus a TextRenderer"""
+    import pygame
+    scores = iter(range(10 ** 6))
+    report('"Score: n", new Font + render', timeit.timeit(
+        lambda: pygame.font.Font(None, 30).render("Score: " + str(next(scores)), True, pygame.Color("white")),
+        number=count), count)
+    renderer = gamebox.get_text_renderer(30, "white")
+    report('"Score: n", TextRenderer glyph blits', timeit.timeit(
+        lambda: renderer.render("Score: " + str(next(scores))), number=count), count)
+
+
+def bench_hud(camera, count=2000):
+    """a steady-state HUD frame (nothing changed) with retained widgets"""
+    label = gamebox.Label(0, 0, 30, "white", "Score: 0")
+    gauge = gamebox.Gauge(0, 600, 20, 150, "red", "black", "white", 2, vertical=True, anchor="bottomleft")
+
+    def frame():
+        label.text = "Score: 0"
+        gauge.value = 0.5
+        camera.draw(label)
+        camera.draw(gauge)
+
+    report('HUD label + gauge, unchanged values', timeit.timeit(frame, number=count), count)
+
+
+def bench_draw(camera, count, rounds=10):
+    """drawing count sprites (half color boxes, half images, spread over twice the screen height) one camera.draw
+    at a time after an on-screen check, versus one camera.draw_many call"""
+    rng = random.Random(0)
+    ball = gamebox.from_circle(0, 0, "white", 4).image
+    sprites = []
+    for i in range(count):
+        x, y = rng.uniform(0, camera.width), rng.uniform(-camera.height, camera.height)
+        if i % 2:
+            sprites.append(gamebox.from_color(x, y, "red", 5, 5))
+        else:
+            sprites.append(gamebox.from_image(x, y, ball))
+
+    def one_at_a_time():
+        for sprite in sprites:
+            if sprite.bottom >= camera.top and sprite.top <= camera.bottom and sprite.right >= camera.left and \
+                    sprite.left <= camera.right:
+                camera.draw(sprite)
+
+    report('%d sprites, camera.draw each' % count, timeit.timeit(one_at_a_time, number=rounds), rounds)
+    report('%d sprites, camera.draw_many' % count, timeit.timeit(lambda: camera.draw_many(sprites), number=rounds),
+           rounds)
+
+
+def bench_enemy_draw(game, camera, count=300, rounds=20):
+    """drawing count on-screen enemies in every hp color by filling each one's rectangle, versus draw_many, which
+    copies one shared surface per color and size"""
+    rng = random.Random(0)
+    enemies = [gamebox.from_color(rng.uniform(0, camera.width), rng.uniform(0, camera.height),
+                                  game.hp_to_color(rng.randint(1, 25)), 30, 30) for _ in range(count)]
+    surface = camera._surface
+
+    def fill_each():
+        for enemy in enemies:
+            surface.fill(enemy.color, (enemy.left, enemy.top, enemy.width, enemy.height))
+
+    report('%d enemies, fill each' % count, timeit.timeit(fill_each, number=rounds), rounds)
+    report('%d enemies, camera.draw_many' % count, timeit.timeit(lambda: camera.draw_many(enemies), number=rounds),
+           rounds)
+
+
+def bench_animation(count=200000):
+    """showing the next frame of a scaled 8-frame animation: setting SpriteBox.image, which looks the scaled frame
+    up in the image cache, versus AnimatedSpriteBox.advance, which takes it from the animation's list"""
+    import pygame
+    frames = [pygame.Surface((16, 16)) for _ in range(8)]
+    box = gamebox.from_image(100, 100, frames[0])
+    box.size = 32, 32
+    step = [0]
+
+    def set_image():
+        step[0] = (step[0] + 1) % 8
+        box.image = frames[step[0]]
+
+    report('SpriteBox.image = next frame', timeit.timeit(set_image, number=count), count)
+    animated = gamebox.AnimatedSpriteBox(100, 100, gamebox.Animation(frames, 1, 'loop', w=32, h=32))
+    report('AnimatedSpriteBox.advance', timeit.timeit(animated.advance, number=count), count)
+
+
+def bench_rotation(rounds=72):
+    """the first time a sprite shows each 5-degree angle: rotating on demand versus a baked RotationBank"""
+    spinning = gamebox.from_text(0, 0, "Spin on demand", 40, "red")
+    report('first rotate(5) per angle, on demand', timeit.timeit(lambda: spinning.rotate(5), number=rounds), rounds)
+    baked = gamebox.from_text(0, 0, "Spin from a bank", 40, "red")
+    bank = baked.bake_rotations(5)
+    report('first rotate(5) per angle, baked (%d KB bank)' % (bank.bytes // 1024),
+           timeit.timeit(lambda: baked.rotate(5), number=rounds), rounds)
+
+
+def sway_and_shoot(level_key, ticks=2000):
+    """a scripted player for game.simulate: picks a level, then holds the mouse down while sweeping left and right"""
+    import pygame
+    yield {level_key}, False
+    for tick in range(ticks):
+        yield {pygame.K_a if tick // 60 % 2 else pygame.K_d}, True
+
+
+def bench_level_load(game, rounds=20):
+    """reading level 2's file: compiling the JSON, loading the compiled table from disk, and from memory"""
+    path = game.level_file(2)
+    constants = {"width": game.camera.width, "height": game.camera.height}
+    with open(path) as f:
+        text = f.read()
+    report('level 2 file, compiled from JSON', timeit.timeit(lambda: gamebox.compile_level(text, constants),
+                                                             number=rounds), rounds)
+
+    def from_disk():
+        gamebox._known_levels.clear()
+        return gamebox.load_level(path, constants)
+
+    report('level 2 file, compiled table from disk cache', timeit.timeit(from_disk, number=rounds), rounds)
+    report('level 2 file, compiled table from memory', timeit.timeit(lambda: gamebox.load_level(path, constants),
+                                                                     number=rounds), rounds)
+
+
+def bench_high_score(lines=20000, rounds=20):
+    """a level's high score: rescanning a text file of saved scores versus asking a ScoreStore"""
+    import shutil
+    import tempfile
+    import scores
+    folder = tempfile.mkdtemp()
+    text_file = os.path.join(folder, 'scores.txt')
+    rng = random.Random(0)
+    with open(text_file, 'w') as f:
+        for _ in range(lines):
+            f.write('%d,%d\n' % (rng.randint(1, 2), rng.randint(0, 20000)))
+
+    def rescan():
+        best = 0
+        with open(text_file) as f:
+            for line in f:
+                level, score = line.strip().split(',')
+                if level == '1' and int(score) > best: best = int(score)
+        return best
+
+    store = scores.ScoreStore(os.path.join(folder, 'scores.db'), text_file)
+    if rescan() != store.high_score('1'): raise Exception("the store and the text file disagree")
+    name = 'high score of %d saved' % lines
+    report(name + ', text rescan', timeit.timeit(rescan, number=rounds), rounds)
+    report(name + ', ScoreStore', timeit.timeit(lambda: store.high_score('1'), number=rounds * 1000), rounds * 1000)
+    report(name + ', ScoreStore.top(10)', timeit.timeit(lambda: store.top('1'), number=rounds), rounds)
+    report('ScoreStore.add', timeit.timeit(lambda: store.add('1', 5), number=rounds), rounds)
+    store.close()
+    store = scores.ScoreStore(os.path.join(folder, 'scores.db'), background=True)
+    report('ScoreStore.add, background writer', timeit.timeit(lambda: store.add('1', 5), number=rounds), rounds)
+    store.close()
+    shutil.rmtree(folder)
+
+
+def bench_pools(game, count=1000, rounds=50):
+    """making bullets: a new color box each time versus reusing boxes from a Pool, and how often the garbage
+    collector runs during a level"""
+    import gc
+    import pygame
+
+    def fresh():
+        bullets = [gamebox.from_color(200, 300, "white", 5, 5) for _ in range(count)]
+        for bullet in bullets:
+            bullet.speedy, bullet.pierce = -10, 1
+            bullet.kill()
+        gamebox.remove_dead(bullets)
+
+    pool = gamebox.color_box_pool(count)
+
+    def pooled():
+        bullets = [pool.acquire(200, 300, "white", 5, 5) for _ in range(count)]
+        for bullet in bullets:
+            bullet.speedy, bullet.pierce = -10, 1
+            bullet.kill()
+        gamebox.remove_dead(bullets, pool)
+
+    collections = [0]
+
+    def counter(phase, info):
+        if phase == 'start': collections[0] += 1
+
+    gc.callbacks.append(counter)
+    for name, make in (('from_color', fresh), ('Pool', pooled)):
+        seconds = timeit.timeit(make, 'import gc; gc.enable()', number=rounds)
+        # timeit turns the garbage collector off while timing unless told otherwise, which would hide its cost
+        collections[0] = 0
+        for _ in range(rounds):
+            make()
+        report('%d bullets made and removed, %s (%d GCs)' % (count, name, collections[0]), seconds, rounds)
+    collections[0] = 0
+    result = game.simulate(sway_and_shoot(pygame.K_1), seed=1)
+    gc.callbacks.remove(counter)
+    print('level 1: %d ticks, %d garbage collections, bullet pool %s' % (result['ticks'], collections[0],
+                                                                         game.projectile_pool.stats()))
+
+
+def bench_headless_levels(game, rounds=3):
+    """whole levels played by sway_and_shoot through game.simulate, with no drawing and no frame cap"""
+    import pygame
+    for name, key in (('level 1', pygame.K_1), ('level 2', pygame.K_2)):
+        results = []
+        seconds = timeit.timeit(lambda: results.append(game.simulate(sway_and_shoot(key))), number=rounds)
+        result = results[-1]
+        report('%s, %d ticks, score %d (%.0f runs/min)' % (name, result['ticks'], result['score'],
+                                                           60 * rounds / seconds), seconds, rounds)
+
+
+def bench_replay(game, rounds=3):
+    """a recorded level 1 run replayed through game.replay, checking every tick's state: the same work every time"""
+    import gamebox
+    import pygame
+    recording = gamebox.InputRecording(seed=2020)
+    game.simulate(sway_and_shoot(pygame.K_1), recording=recording)
+    seconds = timeit.timeit(lambda: game.replay(recording), number=rounds)
+    report('replay of level 1, %d ticks (%.0f ticks/s)' % (len(recording), len(recording) * rounds / seconds),
+           seconds, rounds)
+
+
+if __name__ == "__main__":
+    import game  # imported rather than run, so it waits to be told what to do (drawing with the dummy driver)
+
+    camera = game.camera
+    bench_edge_access()
+    bench_colors()
+    bench_bullet_hits()
+    bench_movers()
+    bench_entity_pool()
+    bench_clear_enemy_wall()
+    bench_clear_enemy_wall(40, 50, 5)
+    bench_score_text()
+    bench_hud(camera)
+    bench_draw(camera, 1000)
+    bench_draw(camera, 10000)
+    bench_enemy_draw(game, camera)
+    bench_rotation()
+    bench_animation()
+    bench_level_load(game)
+    bench_high_score()
+    bench_pools(game)
+    bench_headless_levels(game)
+    bench_replay(game)
@@ -18,14 +18,47 @@ More levels, hi-score boards, etc. - done
 
 import pygame
 import gamebox
-import math
+import scores
+import os
 import random
+import sys
 
-# ------- CAMERA -------
-camera = gamebox.Camera(400, 600)
+# ------- COMMAND LINE -------
+usage = "usage: python game.py [--profile | --record FILE | --replay FILE [--headless] | --headless]"
 
 
+def parse_command_line(args):
+    """
+    Works out what to do from the command line, exiting with the usage message if it makes no sense
+    :param args: list of the arguments after the program name
+    :return: a tuple of the mode ("play", "profile", "record", "replay", or "simulate"), the file name or None,
+    and whether to run without a window
+    """
+    headless = "--headless" in args
+    args = [arg for arg in args if arg != "--headless"]
+    if not args and headless:
+        return "simulate", None, True
+    if not args:
+        return "play", None, False
+    if args == ["--profile"] and not headless:
+        return "profile", None, False
+    if len(args) == 2 and args[0] == "--record" and not args[1].startswith("--") and not headless:
+        return "record", args[1], False
+    if len(args) == 2 and args[0] == "--replay" and not args[1].startswith("--"):
+        return "replay", args[1], headless
+    sys.exit(usage)
+
+
+command = parse_command_line(sys.argv[1:]) if __name__ == "__main__" else ("play", None, False)
+# a program that imports this file to run simulate or replay without a window should set SDL_VIDEODRIVER to
+# "dummy" before importing it (benchmarks.py does)
+
+# ------- CAMERA -------
+camera = gamebox.Camera(400, 600, dirty_rects=True, headless=command[2])
 # creates camera to view the game, sets dimensions at 400 by 600
+# and only sends the parts of the screen that changed to the display each frame
+profiler = gamebox.get_profiler()
+# times each phase of update and render when turned on (python game.py --profile)
 
 # ------- QUALITY OF LIFE FUNCTIONS -------
 
@@ -47,24 +80,6 @@ def out_of_bounds(sprite):
     return off_top or off_bottom or off_right or off_left  # returns True if off any edge
 
 
-def in_camera_range(sprite):
-    """
-    Indicates whether any part of the sprite is inside of the camera range
-    Note: this is NOT the same as not out_of_bounds(sprite) !!
-    :param sprite: a gamebox with the attributes top, bottom, left, and right
-    :return: a boolean indicating whether all parts of said sprite are inside the camera
-    """
-    in_top = sprite.bottom >= camera.top
-    # checks whether any part of the sprite is below the top edge
-    in_bottom = sprite.top <= camera.bottom
-    # checks whether any part of the sprite is above the bottom edge
-    in_right = sprite.left <= camera.right
-    # checks whether any part of the sprite is left of the right edge
-    in_left = sprite.right >= camera.left
-    # checks whether any part of the sprite is right of the left edge
-    return in_top or in_bottom or in_right or in_left
-
-
 # ------- GRAPHICS/ANIMATIONS -------
 # Player Sprites
 player = None
@@ -103,6 +118,8 @@ enemies = {
     "basic": [],
     "mover": []
 }
+mover_motion = gamebox.MotionGroup()
+# moves every mover enemy along its path at once
 
 
 # initializes an empty dict to store list of gameboxes for each kind of enemy
@@ -182,16 +199,11 @@ def make_mover_enemy(x, y, hp=1, x_amplitude=60, y_amplitude=60, x_period=120, y
     :return: nothing
     """
     make_enemy("mover", x, y, 30, 30, hp)
-    enemies["mover"][-1].x_move_timer = 0  # initializes a value for timer to dictate x behavior
-    enemies["mover"][-1].y_move_timer = 0  # initializes a similar value for a timer to dictate y behavior
-    enemies["mover"][-1].x_amplitude = x_amplitude  # initializes a value for amplitude of motion
-    enemies["mover"][-1].x_period = x_period  # initializes value for frequency of motion
-    enemies["mover"][-1].x_phase = x_phase  # initializes a value for phase of motion
-    enemies["mover"][-1].y_amplitude = y_amplitude  # initializes a value for amplitude of motion
-    enemies["mover"][-1].y_period = y_period  # initializes value for frequency of motion
-    enemies["mover"][-1].y_phase = y_phase  # initializes a value for phase of motion
-    enemies["mover"][-1].x_init = x  # initializes an attribute for initial x position
-    enemies["mover"][-1].y_init = y  # initializes an attribute for initial y position
+    mover_motion.add(enemies["mover"][-1],
+                     gamebox.lissajous_path(x, y, x_amplitude, y_amplitude, x_period, y_period, x_phase, y_phase),
+                     mover_motion.tick)
+    # the mover follows a sine wave in x and in y around where it was made, timed from the start of the level
+    # so that a mover made when the camera reaches it is in step with the ones made before it
     # note that the defaults make the mover go in small circles
 
 
@@ -206,11 +218,52 @@ def make_climber_enemy(x, y, hp=1, amplitude=60, period=120, phase=0):
     make_mover_enemy(x, y, hp, 0, amplitude, 120, period, 0, phase)
 
 
+# Explosions
+# orange and yellow bursts left behind by destroyed enemies
+def make_explosion_frame(radius, size=36):
+    """
+    Draws one frame of an explosion: an orange circle with a yellow middle, centered in a clear square
+    :param radius: int radius of the orange circle
+    :param size: int side length of the frame
+    :return: a pygame surface
+    """
+    frame = pygame.Surface((size, size), pygame.SRCALPHA, 32)
+    pygame.draw.circle(frame, gamebox.get_color("orange"), (size // 2, size // 2), radius)
+    pygame.draw.circle(frame, gamebox.get_color("yellow"), (size // 2, size // 2), radius // 2)
+    return frame
+
+
+explosion = gamebox.Animation([make_explosion_frame(radius) for radius in (4, 9, 14, 17, 18, 16, 11, 6)], 3, "once")
+# the frames are drawn once here and every explosion shows them in turn, a new frame every 3 ticks
+explosions = []
+# initializes an empty list to store the explosions that are still going
+
+
+def start_explosion(box, x, y):
+    """
+    Moves a reused explosion to where it's needed and starts it over
+    :param box: an animated gamebox
+    :param x: int x coordinate
+    :param y: int y coordinate
+    :return: nothing
+    """
+    box.x = x
+    box.y = y
+    box.dead = False
+    box.play(explosion)
+
+
+explosion_pool = gamebox.Pool(lambda: gamebox.AnimatedSpriteBox(0, 0, explosion), start_explosion)
+# reuses the explosions that are over
+
+
 # Bullets and other Projectiles
 # white rectangles that shoot in lines and do damage
 projectiles = {
     "player bullet": []
 }
+projectile_pool = gamebox.color_box_pool(64)
+# reuses the boxes of bullets that are gone instead of making new ones for every shot
 
 
 # initializes an empty dictionary to store list of gameboxes for each kind of projectile
@@ -228,8 +281,8 @@ def make_projectile(kind, x, y, color, size, speedx=0, speedy=0, pierce=1):
     :param speedy: int y speed of the bullet (default of 0)
     :return: nothing
     """
-    projectile = gamebox.from_color(x, y, color, size, size)
-    # creates a gamebox with the given parameters
+    projectile = projectile_pool.acquire(x, y, color, size, size)
+    # gets a gamebox with the given parameters, reusing one from a bullet that's gone if there is one
     projectile.speedx = speedx
     projectile.speedy = speedy
     projectile.pierce = pierce
@@ -279,6 +332,8 @@ power_ups = {
     "speed": [],
     "super": []
 }
+power_up_pool = gamebox.color_box_pool()
+# reuses the boxes of power-ups that are gone
 
 
 def make_power_up(kind, x, y, color, size=10):
@@ -291,8 +346,8 @@ def make_power_up(kind, x, y, color, size=10):
     :param color: string indicating the power-up's color
     :return: nothing
     """
-    power_up = gamebox.from_color(x, y, color, size, size)
-    # creates a gamebox with the given parameters
+    power_up = power_up_pool.acquire(x, y, color, size, size)
+    # gets a gamebox with the given parameters, reusing one if possible
     power_up.kind = kind
     # creates a new attribute to store the power-up's kind
     power_ups[kind].append(power_up)
@@ -447,76 +502,96 @@ power_up_indicators = []
 # initializes an empty list to store indicators for power-ups and/or other properties
 
 
+def place(box, x, y):
+    """
+    Moves a reused box to where it's needed
+    :param box: some gamebox
+    :param x: int x coordinate
+    :param y: int y coordinate
+    :return: nothing
+    """
+    box.x = x
+    box.y = y
+
+
+invincible_pool = gamebox.Pool(lambda: gamebox.from_text(0, 0, "i", 36, "black", bold=True), place)
+# reuses the "i" sprites, which are only shown for one tick each
+
+
 def show_invincible(sprite):
     """
     Adds the letter "i" in black over the sprite to indicate invincibility frames
     :param sprite: some gamebox
     :return: nothing
     """
-    invincible = gamebox.from_text(sprite.x, sprite.y, "i", 36, "black", bold=True)
+    invincible = invincible_pool.acquire(sprite.x, sprite.y)
+    invincible.pool = invincible_pool
+    # remembers where it came from so it goes back to the right pool
     power_up_indicators.append(invincible)
 
 
-# HUD Elements (Timer, Health Bar, etc.)
-HUD = []
-# initializes an empty list to store HUD elements
+def clear_indicators():
+    """
+    Takes every indicator off the screen, giving each back to the pool it came from to be reused
+    :return: nothing
+    """
+    for indicator in power_up_indicators:
+        indicator.pool.release(indicator)
+    del power_up_indicators[:]
 
 
-def make_health_bar():
+# HUD Elements (Timer, Health Bar, etc.)
+HUD = []
+# initializes an empty list to store HUD elements that only show up sometimes (like the win and game over text)
+
+health_bar = gamebox.Gauge(0, camera.height, 20, 150, "red", "black", "white", 2, vertical=True, anchor="bottomleft")
+# creates a health bar in the bottom left: a white outline around a black bar that fills up red with player health
+score_display = gamebox.Label(0, 0, 30, "white", "Score: 0")
+# creates a text box displaying the player's score
+multiplier_display = gamebox.Label(0, 0, 30, "white", "Multiplier: 1.0x")
+# creates a text box displaying the player's score multiplier
+scoreboard = gamebox.WidgetStack(0, 0, [score_display, multiplier_display])
+# stacks the multiplier under the score in the top left of the screen
+high_score_display = gamebox.Label(camera.width, 0, 30, "white", "High Score: 0", anchor="topright")
+# creates a text box displaying the high score in the top right of the screen
+HUD_widgets = [health_bar, scoreboard, high_score_display]
+# stores the HUD elements that are always on screen
+# these stay put as the camera scrolls and only redraw themselves when the value they show changes
+
+
+def update_health_bar():
     """
-    Creates a health bar in the bottom left that displays player health
+    Updates the health bar in the bottom left to display player health
     :return: nothing
     """
-    outline = gamebox.from_color(0, 0, "white", 20, 150)
-    # creates a white rectangle
-    outline.center = (camera.left + outline.width / 2, camera.bottom - outline.height / 2)
-    # centers outline in the bottom left
-    total_hp = gamebox.from_color(0, 0, "black", 16, 146)
-    # creates smaller black rectangle
-    total_hp.center = outline.center
-    # centers total health in the same place as outline
     try:
-        hp_remaining = gamebox.from_color(0, 0, "red", total_hp.width, player.hp / init_player_hp * total_hp.height)
-        # creates red rectangle with length corresponding to player health
+        health_bar.value = player.hp / init_player_hp
+        # fills the bar in proportion to player health
     except:
-        hp_remaining = gamebox.from_color(0, 0, "red", total_hp.width, total_hp.height)
-        # creates red rectangle with the same length of total hp if no player is created
-    hp_remaining.bottomleft = total_hp.bottomleft
-    # matches the bottomleft corner of health remaining with the total health
-    HUD.append(outline)
-    HUD.append(total_hp)
-    HUD.append(hp_remaining)
-    # adds all elements to HUD
+        health_bar.value = 1
+        # shows a full bar if no player is created
 
 
-def make_scoreboard():
+def update_scoreboard():
     """
-    Creates a scoreboard in the upper left that displays the player score
+    Updates the scoreboard in the upper left to display the player score
     :return: nothing
     """
     try:
-        scoreboard = gamebox.from_text(0, 0, "Score: " + str(int(player.score)), 30, "white")
-        # creates a text box displaying the player's score
-        multiplier = gamebox.from_text(0, 0, "Multiplier: " + str(int(100 * player.score_multiplier) / 100) + "x", 30,
-                                       "white")
-        # creates a text box displaying the player's score multiplier to the nearest hundredth
+        score_display.text = "Score: " + str(int(player.score))
+        # displays the player's score
+        multiplier_display.text = "Multiplier: " + str(int(100 * player.score_multiplier) / 100) + "x"
+        # displays the player's score multiplier to the nearest hundredth
     except:
-        scoreboard = gamebox.from_text(0, 0, "Score: 0", 30, "white")
-        # creates a text box displaying a score of 0
-        multiplier = gamebox.from_text(0, 0, "Multiplier: 1.0x", 30, "white")
-        # creates a text box displaying a multiplier of 1.0
-    scoreboard.topleft = camera.topleft
-    # moves the scoreboard such that its top left corner is the camera's top left corner
-    multiplier.topleft = scoreboard.bottomleft
-    # positions the multiplier text under the scoreboard
-    HUD.append(scoreboard)
-    HUD.append(multiplier)
-    # adds elements to HUD to be drawn
-
-
-def show_high_score():
-    """
-    Shows the high score for the level in the upper right
+        score_display.text = "Score: 0"
+        # displays a score of 0
+        multiplier_display.text = "Multiplier: 1.0x"
+        # displays a multiplier of 1.0
+
+
+def update_high_score():
+    """
+    Updates the high score for the level in the upper right
     :return: nothing
     """
     try:
@@ -528,12 +603,8 @@ def show_high_score():
     except:
         high_score = 0
         # if no high_score found
-    high_score_display = gamebox.from_text(0, 0, "High Score: " + str(high_score), 30, "white")
-    # creates a text box displaying said high score
-    high_score_display.topright = camera.topright
-    # positions the high_score display in the camera's top right corner
-    HUD.append(high_score_display)
-    # adds element to the HUD to be drawn
+    high_score_display.text = "High Score: " + str(high_score)
+    # displays said high score
 
 
 def make_you_win():
@@ -605,6 +676,44 @@ start_screen.append(begin2)
 # ------- LEVEL/STAGE DESIGNS -------
 # "levels" that contain a preset sequence of enemies, pickups, and bosses
 
+level_timeline = gamebox.SpawnTimeline(margin=60)
+# holds everything a level makes until the camera scrolls within 60 pixels of it
+
+
+def mover_reach(x, y, hp=1, x_amplitude=60, y_amplitude=60, *args, **kwargs):
+    """How far below its starting point a mover enemy made with these arguments can go"""
+    return abs(y_amplitude)
+
+
+def climber_reach(x, y, hp=1, amplitude=60, *args, **kwargs):
+    """How far below its starting point a climber enemy made with these arguments can go"""
+    return abs(amplitude)
+
+
+enemy_makers = (make_basic_enemy, make_mover_enemy, make_slider_enemy, make_climber_enemy)
+# every function a level can schedule that makes an enemy
+
+spawn_reach = {
+    make_mover_enemy: mover_reach,
+    make_climber_enemy: climber_reach
+}
+# functions telling how far below its starting point each kind of moving enemy can get
+
+
+def schedule(make, x, y, *args, **kwargs):
+    """
+    Adds an enemy or power-up to the level, to be made when the camera's top gets close to the lowest point it
+    can reach, which is where it can first be seen as the level scrolls up
+    :param make: the function that makes it, e.g. make_basic_enemy
+    :param x: x coordinate of its initial location
+    :param y: y coordinate of its initial location
+    :param args: the rest of the arguments to make
+    :return: nothing
+    """
+    reach = spawn_reach[make](x, y, *args, **kwargs) if make in spawn_reach else 0
+    level_timeline.add(y + reach + 20, make, x, y, *args, **kwargs)
+    # 20 pixels covers half of the tallest enemy or power-up
+
 
 def level_select(keys):
     """
@@ -618,12 +727,12 @@ def level_select(keys):
     if pygame.K_t in keys:
         test_level()  # loads player, enemies, and other relevant assets for a test level
         curr_level = "TEST"  # sets curr_level to test
-    elif pygame.K_1 in keys:
-        level_one()  # loads level 1
-        curr_level = "1"  # sets curr_level to 1
-    elif pygame.K_2 in keys:
-        level_two()  # loads level 2
-        curr_level = "2"  # sets curr_level to 2
+    else:
+        for number in range(1, 10):
+            if pygame.K_1 + number - 1 in keys and os.path.exists(level_file(number)):
+                load_level_file(number)  # loads the level with that number from its file
+                curr_level = str(number)  # sets curr_level to that number
+                break
 
 
 def test_level():
@@ -632,181 +741,101 @@ def test_level():
     :return: nothing
     """
     make_player(player_color, player_size, init_player_hp)  # makes basic player
-    make_basic_enemy(100, 100)
-    make_basic_enemy(300, 100)
-    make_mover_enemy(200, 50)
-    make_mover_enemy(200, -50)
+    schedule(make_basic_enemy, 100, 100)
+    schedule(make_basic_enemy, 300, 100)
+    schedule(make_mover_enemy, 200, 50)
+    schedule(make_mover_enemy, 200, -50)
     for i in range(-100, -3000, -100):
-        make_basic_enemy(random.randint(50, 150), i + random.randint(-20, 20))
-        make_basic_enemy(random.randint(250, 350), i + random.randint(-20, 20))
-        make_mover_enemy(200, i - 50)
+        schedule(make_basic_enemy, random.randint(50, 150), i + random.randint(-20, 20))
+        schedule(make_basic_enemy, random.randint(250, 350), i + random.randint(-20, 20))
+        schedule(make_mover_enemy, 200, i - 50)
+
+
+level_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")
+# where the level files (level_1.json, level_2.json, ...) are kept
+
+level_makers = {
+    "basic": make_basic_enemy,
+    "mover": make_mover_enemy,
+    "slider": make_slider_enemy,
+    "climber": make_climber_enemy,
+    "health": make_health_power_up,
+    "strength": make_strength_power_up,
+    "rapid fire": make_rapid_fire_power_up,
+    "speed": make_speed_power_up,
+    "super": make_super_power_up
+}
+# the names level files use for each kind of enemy and power-up
 
 
-def level_one():
+def level_file(number):
     """
-    The preset sequence of enemies, pickups, and bosses that make up level one
-    :return: nothing
+    Finds the file describing a numbered level
+    :param number: int level number
+    :return: str path of the level's file (which might not exist)
     """
-    # screen 0: 600-0, also, blank except for player and a few enemies
-    make_player(player_color, player_size, init_player_hp)  # makes basic player
-    make_basic_enemy(100, 100)
-    make_basic_enemy(300, 100)
-
-    # screen 1: 0 - -600: intro to enemies
-    for i in range(15, camera.width, 30):
-        make_basic_enemy(i, -100)
-        make_basic_enemy(i, -200 - i)
-        make_basic_enemy(i, -600 + i)
-    # row of enemies followed by an x
-
-    # screen 2: -600 - -1200: intro to movers
-    make_slider_enemy(200, -700, 1, 100)
-    make_slider_enemy(200, -800, 1, 100, 60)
-    # shows off different move periods
-    make_climber_enemy(50, -950, 1, 100)
-    make_climber_enemy(150, -950, 1, 100, phase=30)
-    make_climber_enemy(250, -950, 1, 100, phase=60)
-    make_climber_enemy(350, -950, 1, 100, phase=90)
-    # fun with different phases
-    for i in range(0, 120, 30):
-        make_mover_enemy(200, -1200, 1, x_amplitude=100, x_phase=i, y_amplitude=100, y_phase=i + 30)
-    # enemies kind of move in a circle
-
-    # screen 3: -1200 - -1800: fun with higher hp enemies
-    for i in range(15, camera.width, 60):
-        make_basic_enemy(i, -1400, 1)
-        make_basic_enemy(i + 30, -1400, 2)
-    # row of 1 and 2
-
-    for i in range(15, camera.width, 60):
-        make_basic_enemy(i, -1500, 2)
-        make_basic_enemy(i + 30, -1500, 1)
-    # row of 2 and 1
-
-    for i in range(15, camera.width, 120):
-        make_basic_enemy(i, -1600, 2)
-        make_basic_enemy(i + 30, -1600, 1)
-        make_basic_enemy(i + 60, -1600, 6)
-        make_basic_enemy(i + 90, -1600, 3)
-    # fun times with 1, 2, 6, and 3
-
-    for i in range(15, camera.width, 120):
-        make_basic_enemy(i, -1700, 11)
-        make_basic_enemy(i + 30, -1700, 21)
-    # row of 11 and 21, I suggest you avoid
-
-    for i in range(15, camera.width, 120):
-        make_basic_enemy(i, -1800, 1)
-        make_basic_enemy(i + 30, -1800, 21)
-        make_basic_enemy(i + 60, -1800, 1)
-    # another row of 1 and 21's I suggest you avoid
-
-    # screen 4: -1800 - -2400: fun with different move patterns
-    for i in range(0, 9):
-        make_mover_enemy(200, -1900 - i * 60, 2, int(200 / 9 * (i + 1)), int(100 / 18 * (i + 1)))
-    # big wavy stick that I thought was cool
-
-    # screen 5: -2400 - 3000: shoot 'em down!!
-    make_rapid_fire_power_up(200, -2500)
-    make_strength_power_up(100, -2500)
-    make_speed_power_up(300, -2500)
-    make_super_power_up(200, -2750)
-    # shows off the power_ups if you missed them
-    for i in range(15, camera.width, 30):
-        for j in range(-2560, -3000, -30):
-            make_basic_enemy(i, j, 2)
-
-
-def level_two():
-    """
-    The preset sequence of enemies, pickups, and bosses that make up level two
+    return os.path.join(level_folder, "level_" + str(number) + ".json")
+
+
+def load_level_file(number):
+    """
+    Sets up a numbered level from its file: the player, plus every enemy and power-up scheduled on the timeline
+    (see gamebox.load_level for the file format)
+    :param number: int level number
     :return: nothing
     """
-    # this level's theme? target practice!
-
-    # screen 0: 600-0, also, blank except for player and a few enemies
     make_player(player_color, player_size, init_player_hp)  # makes basic player
-
-    for i in range(5):
-        make_slider_enemy(100, 300 - 60 * i, 1, 100, 120, 24 * i)
-        make_slider_enemy(300, 300 - 60 * i, 1, 100, 120, 24 * i)
-    # starts off with a few winding snakes to set the mood
-
-    # screen 1: 0 - -600: fun with circles!!!
-    for i in range(0, 120, 15):
-        make_mover_enemy(100, -200, 3, x_amplitude=50, x_phase=i, y_amplitude=50, y_phase=i + 30)
-        make_mover_enemy(300, -200, 1, x_amplitude=50, x_phase=i, y_amplitude=50, y_phase=i + 30)
-    # slow circles to start
-    make_speed_power_up(100, -200)
-    # speed power-up in the yellow circle
-    for i in range(0, 96, 12):
-        make_mover_enemy(100, -400, 1, 50, 50, 96, 96, x_phase=i, y_phase=i + 24)
-        make_mover_enemy(300, -400, 3, 50, 50, 96, 96, x_phase=i, y_phase=i + 24)
-    # faster circles
-    make_rapid_fire_power_up(300, -400)
-    # rapid fire power-up in the yellow circle
-    for i in range(0, 80, 10):
-        make_mover_enemy(100, -600, 3, 50, 50, 80, 80, x_phase=i, y_phase=i + 20)
-        make_mover_enemy(300, -600, 1, 50, 50, 80, 80, x_phase=i, y_phase=i + 20)
-    # and they get even faster, sheesh
-    make_super_power_up(100, -600)
-    # super power-up in the yellow circle
-
-    # screen 2: -600 - -1200: less fun with grids
-    for i in range(15, camera.width, 60):
-        make_climber_enemy(i, -1000, 2, 200)
-        make_climber_enemy(i + 30, -1000, 3, 200, phase=30)
-
-    for i in range(0, 6):
-        make_slider_enemy(200, -800 - 60 * i, 1, 200, phase=i * 20)
-    # combines climbers and sliders
-
-    # screen 3: -1200 - -1800: choices, choices, choices
-    for i in range(60, camera.width - 45, 30):
-        for j in range(-1300, -1700, -30):
-            make_basic_enemy(i, j, 5)
-    # yellow barrier
-    make_health_power_up(15, -1400)
-    make_super_power_up(385, -1400)
-    make_rapid_fire_power_up(200, -1250)
-    make_rapid_fire_power_up(200, -1450)
-    make_rapid_fire_power_up(200, -1650)
-    # power-ups give you options, hopefully
-
-    # screen 4: -1800 - -2400: Don't get too caught up in the small fries
-    for i in range(15, camera.width, 30):
-        for j in range(-1800, -2400, -30):
-            make_basic_enemy(i, j, 1)
-    # lots of nice green
-
-    for i in range(0, 10):
-        make_slider_enemy(200, -1800 - 60 * i, 25, 200, phase=12 * i)
-    # lots of not nice cyan
-
-    # screen 5: -2400 - 3200: Chaos
-    for i in range(0, 20):
-        make_mover_enemy(200, -2600 - 30 * i, 6, 200 * i // 10, 200 + i, 120 - i, 120 + i, (120 - i) // 14,
-                         (120 + i) // 14)
-        # makes a cool pattern, plug it into a graph if you have time later
+    for make, arguments in gamebox.load_level(level_file(number), {"width": camera.width, "height": camera.height}):
+        schedule(level_makers[make], **arguments)
 
 
 # ------- SAVING/LOADING HIGH SCORES --------
 # defines functions to save/load high scores
 
 
+score_file = "super_space_shoot_scores.db"
+# the database scores are saved in (scores saved by older versions in super_space_shoot_scores.txt are copied in)
+score_store = None
+# the scores.ScoreStore, opened the first time it's needed
+
+
+def get_score_store():
+    """
+    Opens the score database the first time it's needed
+    :return: the scores.ScoreStore, or None if scores aren't being saved and there is no database yet
+    """
+    global score_store
+    if score_store is None and (save_scores or os.path.exists(score_file)):
+        score_store = scores.ScoreStore(score_file, background=True)
+        # simulated runs that don't save scores only read them, so they don't make an empty database
+        # scores are written by a background thread so saving never holds up a frame
+        gamebox.on_quit(close_score_store)
+    return score_store
+
+
+def close_score_store():
+    """
+    Finishes saving any scores still being written and closes the database, when the game is closed
+    :return: nothing
+    """
+    global score_store
+    if score_store is not None:
+        score_store.close()
+        score_store = None
+
+
 def save_score():
     """
     Saves a player's score when they complete a level
     :return: nothing
     """
-    save_file = open("super_space_shoot_scores.txt", "a")
-    # opens a new file to save scores in
-    save_file.write(curr_level + "," + str(player.score) + "\n")
-    # writes the current level and player score in one line
-    save_file.close()
-    # closes save file
     player.score_saved = True
     # changes score_saved to indicate that the player's score has been saved
+    if not save_scores:
+        return
+        # simulated runs don't touch the save file
+    get_score_store().add(curr_level, player.score)
+    # queues the current level and player score to be saved, which also updates the level's high score right away
 
 
 def get_high_score():
@@ -814,37 +843,9 @@ def get_high_score():
     Gets the saved high score when a level is booted
     :return: save high score as an int for the level
     """
-    try:
-        scores = {}  # initializes a dict to store scores
-        with open("super_space_shoot_scores.txt", "r") as f:
-            # opens the file to read if it exists
-            for line in f.readlines():
-                # splits by new line
-                clean_line = line.strip()
-                # strips line of white space
-                if len(clean_line) >= 1:
-                    # checks that line has characters in it
-                    if clean_line.split(",")[0] in scores.keys():
-                        # checks whether there's already an entry in the dict for the level
-                        scores[clean_line.split(",")[0]].append(int(clean_line.split(",")[1]))
-                        # if so, adds the score as an int to the list
-                    else:
-                        scores[clean_line.split(",")[0]] = [int(clean_line.split(",")[1])]
-                        # otherwise adds a list with the first score to the level's key in the dict
-            # f.close() is already implied here
-
-        high_score = 0  # initializes an int to store high score
-        for score in scores[curr_level]:
-            # loops over scores for that current level
-            if score > high_score:
-                # if a score is greater than the high score
-                high_score = score
-                # it's the new high_score
-    except:
-        high_score = 0
-        # if no file is find, the high score is 0 by default
-
-    return high_score
+    store = get_score_store()
+    return store.high_score(curr_level) if store else 0
+    # the store keeps every level's high score in memory, so this doesn't read the file
 
 
 # ------- INITIAL CONDITIONS --------
@@ -852,6 +853,7 @@ game_on = False  # keeps the game from turning on
 curr_level = ""  # initializes a variable to store current level as a string
 level_high_score = 0  # initializes an int to store the level high score
 # so the save file doesn't have to be constantly read
+save_scores = True  # whether finished levels are recorded in the save file
 
 # Player
 player_color = "white"  # sets player color
@@ -869,6 +871,10 @@ enemy_move_speed = 5  # sets initial value for enemy move speed
 # Scroll Speed
 scroll_speed = 2  # sets magnitude of scroll speed
 
+# Collision Grids
+enemy_grid = gamebox.SpatialGrid(60)  # buckets enemies by location so collisions only check nearby enemies
+power_up_grid = gamebox.SpatialGrid(60)  # does the same for power-ups
+
 # Bullet
 bullet_speed = 10  # initializes the bullet speed to be 10
 has_power_up = {
@@ -879,11 +885,15 @@ has_power_up = {
 }
 
 
-def tick(keys):
+def update(keys, dt=None, click=None):
     """
-    Animation, input, collision detection, scoring, drawing...
-    anything that happens every second, you name it, and
+    Animation, input, collision detection, scoring...
+    anything that happens every tick besides drawing, you name it, and
     it's probably mentioned somewhere in this function. Go figure.
+    :param keys: a set of the keys currently held down
+    :param dt: seconds per tick (unused, since everything in the game is counted in ticks)
+    :param click: whether the mouse button is held down (None to check the real mouse)
+    :return: nothing
     """
     # documentation format stolen from the pong lab, thank you for the help!
     # ----- GLOBAL VARIABLES -----
@@ -897,8 +907,10 @@ def tick(keys):
     global level_high_score
 
     # ----- THINGS THAT SHOULD BE CLEARED EVERY TICK (BETTER NAME PENDING) -----
+    profiler.mark()
     HUD = []
-    power_up_indicators = []
+    clear_indicators()
+    # gives last tick's indicators back to be reused
 
     # ----- MOVEMENT/SCROLL -----
     if game_on:
@@ -913,19 +925,24 @@ def tick(keys):
             for enemy in enemy_kind:
                 enemy.move_speed()
         # moves each enemy by its designated speed
+        profiler.lap("move")
 
     else:
         camera.topleft = (0, 0)
         # forces camera position to be at its initial position
         for kind in enemies.keys():
             enemies[kind] = []  # clears all lists of enemies initially
+        mover_motion.clear()
+        level_timeline.clear()
+        explosion_pool.release_all(explosions)
         for kind in projectiles.keys():
-            projectiles[kind] = []  # clears all lists of projectiles initially
+            projectile_pool.release_all(projectiles[kind])  # clears all lists of projectiles initially
         for kind in power_ups.keys():
-            power_ups[kind] = []  # clears all lists of power_ups initially
+            power_up_pool.release_all(power_ups[kind])  # clears all lists of power_ups initially
 
         level_select(keys)
         # loads a level depending on what key is pressed
+        profiler.lap("level select")
 
     # ------- USER INPUT ---------
     if curr_level and not game_on:
@@ -934,6 +951,11 @@ def tick(keys):
         # gets the high score for the current level
         level_high_score = get_high_score()
 
+    if game_on:
+        level_timeline.update(camera)
+        # makes the enemies and power-ups the camera is about to reach
+    profiler.lap("spawn")
+
     if game_on and player:
         # checks that the game is on and that player exists
         if pygame.K_w in keys and player.top > camera.top:
@@ -946,7 +968,10 @@ def tick(keys):
             player.x -= player_move_speed
         # WASD to move but only if player is not moving out of camera range in each direction
 
-        if camera.mouseclick:
+        if click is None:
+            click = camera.mouseclick
+            # checks the real mouse unless told whether it's clicked
+        if click:
             # when mouse is clicked
             if player.bullet_timer % player_fire_rate:
                 # if the current timer is not divisible by 10
@@ -964,6 +989,8 @@ def tick(keys):
         # if you hold down the mouse, the ship fires a bullet every 10 frames
         # but if you mash the mouse button you can shoot more
 
+    profiler.lap("input")
+
     # ------- BULLET BEHAVIOR ---------
     # defines relevant projectile behavior for all projectiles made
     for projectile_type in projectiles.values():
@@ -972,71 +999,73 @@ def tick(keys):
             # loops over each projectile
             if out_of_bounds(projectile):
                 # if any are out of bounds
-                projectile_type.remove(projectile)
-                # they're no longer relevant
+                projectile.kill()
+                # they're no longer relevant, so they're marked to be removed at the end of the bullet phase
 
     # note that basic player bullets travel up by preset default and aren't included here
+    profiler.lap("bullet cleanup")
 
     # ------- ENEMY BEHAVIOR ---------
     # where enemy movement, shooting, and other behaviors are defined
 
+    camera_bottom = camera.bottom
+    # looks up the bottom of the camera once instead of for every enemy
     for enemy_kind in enemies.values():
         # for all lists of enemies present
         for enemy in enemy_kind:
             # loops over each enemy in each list
-            if enemy.top > camera.bottom:
+            if enemy.top > camera_bottom:
                 # if any are below the bottom of the screen
-                enemy_kind.remove(enemy)
-                # they're no longer relevant
+                enemy.kill()
+                # they're no longer relevant, so they're marked to be removed
     # note: above-screen enemies are not drawn instead of completely de-spawned like bullets
     # to allow for good level planning
 
     for enemy_kind in enemies.values():
         for enemy in enemy_kind:
-            if enemy.hp <= 0:
-                # if the health of any enemy drops at or below 0
+            if enemy.hp <= 0 and not enemy.dead:
+                # if the health of any enemy still on screen drops at or below 0
                 make_random_power_up(enemy.x, enemy.y)
                 # makes a random power up drop from the enemy when killed
-                enemy_kind.remove(enemy)  # the enemy is destroyed
+                explosions.append(explosion_pool.acquire(enemy.x, enemy.y))
+                # leaves an explosion where the enemy was
+                enemy.kill()  # the enemy is destroyed
                 if player:
                     # only occurs if the player exists
                     player.score += int(enemy.score * player.score_multiplier)
                     # the player gets some score increase times their current score multiplier
                     player.score_multiplier += enemy.score / 100
                     # score multiplier increases proportional to score increased
+        gamebox.remove_dead(enemy_kind)
+        # takes out all enemies marked above in one pass
 
     # note that basic enemies don't shoot or move
 
-    for enemy in enemies["mover"]:
-        x_scalar = math.sin(2 * math.pi / enemy.x_period * enemy.x_move_timer - enemy.x_phase)
-        enemy.x = enemy.x_amplitude * x_scalar + enemy.x_init
-        y_scalar = math.sin(2 * math.pi / enemy.y_period * enemy.y_move_timer - enemy.y_phase)
-        enemy.y = enemy.y_amplitude * y_scalar + enemy.y_init
-        # each enemy moves sinusoidally in the x and y directions with their given amplitudes
-        # with scalars storing the result of the sine function to save line space
-        # this can be modified later as needed
-        enemy.x_move_timer += 1
-        enemy.y_move_timer += 1
-        # increases move timer
-        if enemy.x_move_timer == enemy.x_period:
-            enemy.x_move_timer = 0
-        if enemy.y_move_timer == enemy.y_period:
-            enemy.y_move_timer = 0
-            # resets move timer after reaching the period so we don't have to store so much data
+    mover_motion.step()
+    # each mover moves sinusoidally in the x and y directions with their given amplitudes, all at once
+    # (killed movers were just taken out of the enemy list and are dropped from the group too)
     # moves side to side sinusoidally with the power of math
+    profiler.lap("enemies")
+
+    for boom in explosions:
+        if boom.advance():
+            boom.kill()
+            # explosions are taken out once they have shown their last frame
+    gamebox.remove_dead(explosions, explosion_pool)
+    profiler.lap("explosions")
 
     # ----- COLLISION DETECTION -----
+    camera_top = camera.top
+    enemy_grid.rebuild(enemy for enemy_kind in enemies.values() for enemy in enemy_kind if enemy.bottom >= camera_top)
+    # buckets every enemy that reaches into the screen by grid cell so each collision check only looks at enemies
+    # close by (the player and bullets never leave the screen, so enemies above it can't be hit yet)
+
     if player:
         # only occurs if player exists
 
-        player_touches_enemy = False
-        # initializes a boolean that can stored whether an enemy is touching the player
+        player_touches_enemy = bool(enemy_grid.touching(player))
+        # stores whether any enemy is touching the player
         # without having to loop any other actions for the enemies present
-        for enemy_kind in enemies.values():
-            for enemy in enemy_kind:
-                # for all enemies in all lists:
-                if player.touches(enemy):
-                    player_touches_enemy = True
 
         if player_touches_enemy:
             # if a player exists and touches any enemy
@@ -1086,23 +1115,31 @@ def tick(keys):
 
     for bullet in projectiles["player bullet"]:
         # loops over player bullets
-        for enemy_kind in enemies.values():
-            for enemy in enemy_kind:
-                # for all enemies in all enemy lists
-                if bullet.touches(enemy):
-                    # if the bullet touches the enemy
-                    bullet.pierce -= 1
-                    # the bullet loses some pierce
-                    enemy.hp -= 1
-                    # the enemy loses one hp
+        if bullet.dead:
+            continue
+            # skips bullets that already went out of bounds
+        for enemy in enemy_grid.touching(bullet):
+            # for all enemies the bullet touches
+            profiler.count("bullet hits")
+            bullet.pierce -= 1
+            # the bullet loses some pierce
+            enemy.hp -= 1
+            # the enemy loses one hp
+            color = gamebox.get_color(hp_to_color(enemy.hp))
+            if color != enemy.color:
+                enemy.color = color
+                # the enemy changes color when its hp drops into the next tier down
 
     for bullet_list in projectiles.values():
         for bullet in bullet_list:
             # for all bullets
             if bullet.pierce <= 0:
                 # when bullet pierce is less than zero
-                bullet_list.remove(bullet)
-                # remove the bullet
+                bullet.kill()
+                # mark the bullet to be removed
+        gamebox.remove_dead(bullet_list, projectile_pool)
+        # takes out all bullets marked this tick (spent or out of bounds) in one pass, keeping them to reuse
+    profiler.lap("collisions")
 
     # ----- POWER-UP BEHAVIOR -----
     # defines relevant power-up behavior for all power-ups made
@@ -1116,28 +1153,40 @@ def tick(keys):
                 # loops over each power_up
                 if camera.bottom < power_up.top:
                     # if any are below the camera's bounds
-                    power_up_list.remove(power_up)
+                    power_up.kill()
                     # they're no longer relevant
 
-                if player.touches(power_up) and not player.power_up_timer:
-                    # checks whether the player is touching a power_up with a current power_up in effect
-                    player_touches_power_up = True
-                    # changes this condition to indicate it is
-                    curr_power_up = power_up.kind
-                    # stores kind of power-up in contact in here
-                    power_up_list.remove(power_up)
-                    # removes said power-up from play
+        power_up_grid.rebuild(power_up for power_up_list in power_ups.values() for power_up in power_up_list
+                              if not power_up.dead)
+        # buckets the remaining power-ups by grid cell like the enemies
+        if not player.power_up_timer:
+            # checks that the player does not have a current power_up in effect
+            for power_up in power_up_grid.touching(player):
+                # loops over each power_up touching the player
+                player_touches_power_up = True
+                # changes this condition to indicate it is
+                curr_power_up = power_up.kind
+                # stores kind of power-up in contact in here
+                power_up.kill()
+                # removes said power-up from play
+
+        for power_up_list in power_ups.values():
+            gamebox.remove_dead(power_up_list, power_up_pool)
+        # takes out all power-ups marked this tick in one pass, keeping them to reuse
 
         if player_touches_power_up or player.power_up_timer:
             add_power_up(curr_power_up)
             # adds power_up effects if the player has just touched the power_up
             # or if their timer has not run out
 
+    profiler.lap("power-ups")
+
     # ----- HUD Elements -----
-    # where HUD elements are recreated every tick for accurate information
-    make_health_bar()
-    make_scoreboard()
-    show_high_score()
+    # where HUD elements are updated every tick for accurate information
+    update_health_bar()
+    update_scoreboard()
+    update_high_score()
+    profiler.lap("HUD")
 
     # ----- SCROLLING LEVEL -----
     # where appropriate elements are moved up with the camera
@@ -1164,7 +1213,7 @@ def tick(keys):
             enemies_present = True
             # set enemies_present to true
 
-    if not enemies_present and game_on and player:
+    if not enemies_present and not level_timeline and game_on and player:
         # if no enemies are present and that the player is alive
         make_you_win()
         # print the win statement
@@ -1175,10 +1224,22 @@ def tick(keys):
         # make restarting possible
         if pygame.K_SPACE in keys:
             game_on = False
+    profiler.lap("scroll and win")
+    profiler.count("enemies", sum(len(enemy_list) for enemy_list in enemies.values()))
+    profiler.count("bullets", sum(len(bullet_list) for bullet_list in projectiles.values()))
+    profiler.count("power-ups", sum(len(power_up_list) for power_up_list in power_ups.values()))
+
 
+def render(alpha=1):
+    """
+    Draws everything set up by update and displays it
+    :param alpha: how far real time is between two updates (unused, since sprites are drawn where update left them)
+    :return: nothing
+    """
     # ----- DRAW METHODS --------
+    profiler.mark()
     camera.clear("black")
-    # where everything above is actually drawn and displayed
+    # where everything set up in update is actually drawn and displayed
     if not game_on:
         for element in start_screen:
             camera.draw(element)
@@ -1192,30 +1253,224 @@ def tick(keys):
         camera.draw(indicator)
     # draw all power_up indicators
 
-    for projectile_list in projectiles.values():
-        for projectile in projectile_list:
-            camera.draw(projectile)
+    camera.draw_many(projectile for projectile_list in projectiles.values() for projectile in projectile_list)
     # draws all active bullets
 
-    for enemy_list in enemies.values():
-        for enemy in enemy_list:
-            if in_camera_range(enemy):
-                camera.draw(enemy)
-    # draws all enemies that are in camera range
-
-    for power_up_list in power_ups.values():
-        for power_up in power_up_list:
-            if in_camera_range(power_up):
-                camera.draw(power_up)
+    camera.draw_many(enemy for enemy_list in enemies.values() for enemy in enemy_list)
+    # draws all enemies that are in camera range (draw_many skips the ones that aren't)
+
+    camera.draw_many(explosions)
+    # draws all explosions over the enemies
+
+    camera.draw_many(power_up for power_up_list in power_ups.values() for power_up in power_up_list)
     # draws all power-ups that are in camera range
 
+    profiler.lap("draw sprites")
+
+    for widget in HUD_widgets:
+        camera.draw(widget)
     for element in HUD:
         camera.draw(element)
     # draws all HUD elements
+    if profiler.overlay is not None:
+        camera.draw(profiler.overlay)
+        # draws the profiler's numbers over everything when profiling
+    profiler.lap("draw HUD")
 
     camera.display()
+    profiler.lap("display")
+
+
+def tick(keys):
+    """
+    Runs one update and draws the result, for running the game with gamebox.timer_loop
+    :param keys: a set of the keys currently held down
+    :return: nothing
+    """
+    update(keys)
+    render()
+
+
+def reset_game():
+    """
+    Puts the game back the way it is when the program starts: on the start screen with no power-ups in effect
+    :return: nothing
+    """
+    global game_on, curr_level, level_high_score, player, curr_power_up, player_move_speed, player_fire_rate
+    global HUD, power_up_indicators
+    game_on = False
+    curr_level = ""
+    level_high_score = 0
+    player = None
+    curr_power_up = None
+    player_move_speed = 5
+    player_fire_rate = 10
+    for kind in has_power_up.keys():
+        has_power_up[kind] = False
+    HUD = []
+    clear_indicators()
+    # resets everything update changes besides what it clears itself when the game is off
+
+
+def state_checksum():
+    """
+    Summarizes everything that changes while playing: the level, the camera, the player, and every enemy, bullet,
+    and power-up, so two runs can be compared tick by tick
+    :return: int checksum of the game state
+    """
+    values = [curr_level, game_on, camera.y, curr_power_up]
+    if player:
+        values += [player.x, player.y, player.hp, player.score, player.score_multiplier]
+    for kind_lists in (enemies, projectiles, power_ups):
+        for kind in sorted(kind_lists.keys()):
+            for box in kind_lists[kind]:
+                values += [box.x, box.y]
+    for enemy_list in enemies.values():
+        values += [enemy.hp for enemy in enemy_list]
+    return gamebox.checksum(values)
+
+
+def simulate(inputs, max_ticks=None, stop_at_end=True, seed=None, recording=None):
+    """
+    Plays the game without drawing anything, as fast as the computer can, for balancing and regression tests
+    The first input should select a level, e.g. ({pygame.K_1}, False), or nothing will happen
+    :param inputs: an iterable giving (set of keys held down, whether the mouse is clicked) for each tick
+    :param max_ticks: int most ticks to run, or None to run until inputs run out
+    :param stop_at_end: whether to stop as soon as the player wins or dies
+    :param seed: seed for the random numbers, or None to leave them unseeded; recordings supply their own seed
+    :param recording: a gamebox.InputRecording to add each tick to, for replaying the run later
+    :return: a dict with the level, ticks run, score, player hp, enemies left, and whether the player won or died
+    """
+    global save_scores
+    reset_game()
+    if recording is not None:
+        seed = recording.seed
+    if seed is not None:
+        random.seed(seed)
+    saving = save_scores
+    save_scores = False
+    # simulated runs shouldn't fill the save file with scores
+    ticks = 0
+    score = 0
+    try:
+        for keys, click in inputs:
+            if max_ticks is not None and ticks >= max_ticks:
+                break
+            if player:
+                score = player.score
+                # remembers the score in case the player dies this tick
+            update(keys, click=click)
+            profiler.end_frame()
+            ticks += 1
+            if recording is not None:
+                recording.record(keys, click, state=state_checksum())
+            if stop_at_end and game_on and (not player or not (any(enemies.values()) or level_timeline)):
+                break
+                # stops when the player dies or no enemies are left
+    finally:
+        save_scores = saving
+    return {
+        "level": curr_level,
+        "ticks": ticks,
+        "score": player.score if player else score,
+        "hp": player.hp if player else 0,
+        "enemies left": sum(len(enemy_list) for enemy_list in enemies.values()) + level_timeline.pending(*enemy_makers),
+        "won": bool(game_on and player and not any(enemies.values()) and not level_timeline),
+        "died": bool(game_on and not player)
+    }
+
+
+def replay(recording, headless=True):
+    """
+    Plays a recorded game back exactly, stopping with an Exception on the first tick that doesn't match the recording
+    :param recording: a gamebox.InputRecording from play_and_record or simulate
+    :param headless: whether to replay without drawing, as fast as possible, or in the window at normal speed
+    :return: the number of ticks replayed
+    """
+    global save_scores
+    reset_game()
+    random.seed(recording.seed)
+    saving = save_scores
+    save_scores = False
+    # a replayed game was already saved when it was played
+    frames = iter(recording)
+    ticks = [0]
+
+    def replay_update(keys, dt=None):
+        """plays the next recorded tick in place of the keys actually held down"""
+        for recorded_keys, click in frames:
+            update(recorded_keys, dt, click)
+            recording.check(ticks[0], state_checksum())
+            ticks[0] += 1
+            return
+        gamebox.stop_loop()
+        # the recording ran out
+
+    try:
+        if headless:
+            for _ in range(len(recording)):
+                replay_update(None)
+        else:
+            gamebox.fixed_step_loop(ticks_per_second, replay_update, render)
+    finally:
+        save_scores = saving
+    return ticks[0]
+
+
+def play_and_record(filename, seed=None):
+    """
+    Plays the game normally while recording every tick, saving the recording when the window closes
+    :param filename: str file to save the gamebox.InputRecording in
+    :param seed: seed for the random numbers, or None to pick one from the clock
+    :return: the recording
+    """
+    recording = gamebox.InputRecording(seed)
+    reset_game()
+    random.seed(recording.seed)
+
+    def recording_update(keys, dt=None):
+        """plays a tick and adds it to the recording"""
+        click = camera.mouseclick
+        update(keys, dt, click)
+        recording.record(keys, click, pygame.mouse.get_pos(), state_checksum())
+
+    try:
+        gamebox.fixed_step_loop(ticks_per_second, recording_update, render)
+    finally:
+        recording.save(filename)
+    return recording
 
 
 ticks_per_second = 30
 
-gamebox.timer_loop(ticks_per_second, tick)
+def sway_and_shoot(level_key=pygame.K_1, ticks=2000):
+    """
+    A scripted player for simulate: picks a level, then holds the mouse down while sweeping left and right
+    :param level_key: the key that picks the level, e.g. pygame.K_1
+    :param ticks: int how many ticks to play after picking the level
+    :return: a generator of (set of keys held down, whether the mouse is clicked) for each tick
+    """
+    yield {level_key}, False
+    for tick in range(ticks):
+        yield {pygame.K_a if tick // 60 % 2 else pygame.K_d}, True
+
+
+if __name__ == "__main__":
+    mode, filename, headless = command
+    if mode == "profile":
+        profiler.enabled = True
+        profiler.show_overlay(camera.width, 40, anchor="topright")
+        gamebox.fixed_step_loop(ticks_per_second, update, render)
+        profiler.dump("super_space_shoot_profile.csv")
+        # shows where each frame's time goes while playing, and saves the numbers when the game is closed
+    elif mode == "record":
+        play_and_record(filename)
+    elif mode == "replay":
+        print(replay(gamebox.InputRecording.load(filename), headless=headless), "ticks replayed")
+        # with --headless the recording is checked as fast as possible without drawing anything
+    elif mode == "simulate":
+        print(simulate(sway_and_shoot()))
+        # plays level 1 with a scripted player and no window, and prints how it went
+    else:
+        gamebox.fixed_step_loop(ticks_per_second, update, render)
+        # updates the game 30 times a second, catching up after slow frames, and draws after each round of updates
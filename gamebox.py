@@ -11,12 +11,29 @@ that benefited from this code.
 
 from __future__ import division  # only used in python2
 
+import ast
+import hashlib
+import json
+import math
+import operator
+import os
 import os.path
+import struct
+import tempfile
+import threading
+import time
 import urllib
+import zlib
+from collections import OrderedDict, deque
 
 import pygame
 import sys
 
+try:
+    import numpy as _np
+except ImportError:  # numpy is only needed for EntityPool
+    _np = None
+
 if 'urlretrieve' not in dir(urllib):  # python 3
     from urllib.request import urlretrieve as _urlretrieve
 else:  # python 2
@@ -24,8 +41,140 @@ else:  # python 2
 
 pygame.init()
 
+
+class ImageCache(object):
+    """A size-bounded cache of Surfaces that forgets the least recently used ones first.
+    Memory is measured as width * height * bytes-per-pixel; pinned entries (images loaded from files or urls) are
+    never forgotten.
+    Keeps hits, misses, and evictions counters so you can see how well it is working."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """ImageCache(32 * 1024 * 1024) makes a cache that holds roughly 32MB of unpinned images"""
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.pinned_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lru = OrderedDict()
+        self._pinned = {}
+        self._refs = {}
+
+    def _add_ref(self, surface):
+        """counts one more entry using surface, returning the bytes it adds (0 if another entry already holds it)"""
+        sid = id(surface)
+        self._refs[sid] = self._refs.get(sid, 0) + 1
+        if self._refs[sid] > 1: return 0
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def _drop_ref(self, surface):
+        """counts one fewer entry using surface, returning the bytes it frees (0 if another entry still holds it)"""
+        sid = id(surface)
+        self._refs[sid] -= 1
+        if self._refs[sid] > 0: return 0
+        del self._refs[sid]
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def __contains__(self, key):
+        return key in self._pinned or key in self._lru
+
+    def __len__(self):
+        return len(self._pinned) + len(self._lru)
+
+    def __getitem__(self, key):
+        ans = self.get(key)
+        if ans is None: raise KeyError(key)
+        return ans
+
+    def __setitem__(self, key, surface):
+        self.put(key, surface)
+
+    def get(self, key, default=None):
+        """cache.get(key) returns the cached Surface (marking it recently used) or default if there is none"""
+        if key in self._pinned:
+            self.hits += 1
+            return self._pinned[key]
+        if key in self._lru:
+            self.hits += 1
+            self._lru.move_to_end(key)
+            return self._lru[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, surface, pin=False):
+        """cache.put(key, surface) stores surface, evicting old unpinned entries if over budget
+        cache.put(key, surface, True) stores it pinned, so it is never evicted"""
+        self.remove(key)
+        added = self._add_ref(surface)
+        if pin:
+            self._pinned[key] = surface
+            self.pinned_bytes += added
+        else:
+            self._lru[key] = surface
+            self.bytes += added
+            self._evict()
+
+    def pin(self, key):
+        """keeps an already-cached entry from ever being evicted"""
+        if key in self._lru:
+            surface = self._lru.pop(key)
+            self._pinned[key] = surface
+            if self._refs[id(surface)] == 1:
+                size = surface.get_width() * surface.get_height() * surface.get_bytesize()
+                self.bytes -= size
+                self.pinned_bytes += size
+
+    def remove(self, key):
+        """forgets key if it is cached; does nothing otherwise"""
+        if key in self._pinned:
+            self.pinned_bytes -= self._drop_ref(self._pinned.pop(key))
+        elif key in self._lru:
+            self.bytes -= self._drop_ref(self._lru.pop(key))
+
+    def clear(self):
+        """forgets every entry, pinned or not; counters are kept"""
+        self._lru.clear()
+        self._pinned.clear()
+        self._refs.clear()
+        self.bytes = 0
+        self.pinned_bytes = 0
+
+    def _evict(self):
+        # the newest entry always stays, even if it alone is over budget
+        while self.bytes > self.max_bytes and len(self._lru) > 1:
+            key, surface = self._lru.popitem(last=False)
+            self.bytes -= self._drop_ref(surface)
+            self.evictions += 1
+
+    def stats(self):
+        """returns a dict of entry counts, memory use in bytes, and hit/miss/eviction counters"""
+        return {'entries': len(self), 'pinned': len(self._pinned), 'bytes': self.bytes,
+                'pinned_bytes': self.pinned_bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return 'ImageCache with %d entries using %d of %d bytes' % (len(self), self.bytes, self.max_bytes)
+
+
+__all__ = ['ImageCache']
+
 # a cache to avoid loading images many time
-_known_images = {}
+_known_images = ImageCache()
+
+
+def set_image_cache(cache):
+    """Replaces the cache used for loaded, flipped, scaled, and rotated images; returns the old one.
+    Any object with the same get/put/pin/__contains__ methods as ImageCache will do."""
+    global _known_images
+    old = _known_images
+    _known_images = cache
+    return old
+
+
+__all__.append('set_image_cache')
 
 
 def _image(key, flip=False, w=0, h=0, angle=0):
@@ -33,51 +182,190 @@ def _image(key, flip=False, w=0, h=0, angle=0):
     if '__hash__' not in dir(key):
         key = id(key)
     angle, w, h = int(angle), int(w), int(h)
-    if (key, flip, w, h, angle) in _known_images:
-        ans = _known_images[(key, flip, w, h, angle)]
-    elif angle != 0:
-        base = _image(key, flip, w, h)
-        img = pygame.transform.rotozoom(base, angle, 1)
-        _known_images[(key, flip, w, h, angle)] = img
-        ans = img
-    elif w != 0 or h != 0:
-        base = _image(key, flip)
-        img = pygame.transform.smoothscale(base, (w, h))
-        _known_images[(key, flip, w, h, angle)] = img
-        ans = img
-    elif flip:
-        base = _image(key)
-        img = pygame.transform.flip(base, True, False)
-        _known_images[(key, flip, w, h, angle)] = img
-        ans = img
-    else:
-        img, _ = _get_image(key)
-        _known_images[(key, flip, w, h, angle)] = img
-        ans = img
+    ans = _known_images.get((key, flip, w, h, angle))
+    if ans is None:
+        if angle != 0:
+            base = _image(key, flip, w, h)
+            ans = pygame.transform.rotozoom(base, angle, 1)
+            _known_images.put((key, flip, w, h, angle), ans)
+        elif w != 0 or h != 0:
+            base = _image(key, flip)
+            ans = pygame.transform.smoothscale(base, (w, h))
+            _known_images.put((key, flip, w, h, angle), ans)
+        elif flip:
+            base = _image(key)
+            ans = pygame.transform.flip(base, True, False)
+            _known_images.put((key, flip, w, h, angle), ans)
+        else:
+            ans, _ = _get_image(key)
+            # images loaded from files or urls are pinned; surfaces made by the program are not, so the many
+            # one-off surfaces from from_text and the like can still be evicted
+            _known_images.put((key, flip, w, h, angle), ans, type(key) is str)
     if w == 0 and h == 0:
         if angle != 0:
             tmp = _image(key, flip, w, h)
         else:
             tmp = ans
-        _known_images[(key, flip, tmp.get_width(), tmp.get_height(), angle)] = ans
+        alias = (key, flip, tmp.get_width(), tmp.get_height(), angle)
+        if alias not in _known_images:
+            _known_images.put(alias, ans, type(key) is str and not flip and not angle)
     return ans
 
 
+class OfflineAssetError(IOError):
+    """Raised when an offline AssetCache is asked for a url it doesn't have"""
+
+
+__all__.append('OfflineAssetError')
+
+
+class AssetCache(object):
+    """Keeps downloaded images in a local folder so each url is fetched only once, ever.
+    Files are named by a hash of their contents (so two urls with the same name can't overwrite each other) and
+    manifest.json in the folder records which file holds each url.
+    ----
+    gamebox.preload(["https://example.com/ship.png", "https://example.com/boom.png"])  # before the game loop
+    gamebox.get_asset_cache().offline = True  # from here on a url that wasn't preloaded is an error, not a download
+    ----
+    With offline=True the cache never touches the network: a url must already be in the folder (from an earlier
+    run, or copied along with the game) or loading it raises an OfflineAssetError (an IOError, like a failed
+    download)."""
+
+    manifest_name = 'manifest.json'
+
+    def __init__(self, folder='.asset_cache', offline=False):
+        self.folder = folder
+        self.offline = offline
+        # how many urls have been downloaded by this cache
+        self.fetched = 0
+        self._manifest = None
+
+    def _entries(self):
+        """the manifest, read from the folder the first time it is needed"""
+        if self._manifest is None:
+            try:
+                with open(os.path.join(self.folder, self.manifest_name)) as f:
+                    self._manifest = json.load(f)
+            except (IOError, OSError, ValueError):
+                self._manifest = {}
+        return self._manifest
+
+    def _write(self, filename, write):
+        """writes a file in the folder through a temporary file, so it is never left half written"""
+        if not os.path.isdir(self.folder): os.makedirs(self.folder)
+        path = os.path.join(self.folder, filename)
+        write(path + '.tmp')
+        if os.path.exists(path): os.remove(path)  # python 2 on windows can't rename over a file
+        os.rename(path + '.tmp', path)
+        return path
+
+    def _save_manifest(self):
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(self._entries(), f, indent=1, sort_keys=True)
+
+        self._write(self.manifest_name, write)
+
+    def __contains__(self, url):
+        entry = self._entries().get(url)
+        return entry is not None and os.path.exists(os.path.join(self.folder, entry['file']))
+
+    def path(self, url):
+        """
+        The local file holding url's contents, downloading it first if it isn't in the folder yet
+        :param url: str url (http://... is assumed when there is no scheme)
+        :return: str path of the file
+        """
+        if url in self: return os.path.join(self.folder, self._entries()[url]['file'])
+        if self.offline:
+            raise OfflineAssetError(url + " is not in the asset cache and the cache is offline; preload it first")
+        source = url if '://' in url else 'http://' + url
+        if not os.path.isdir(self.folder): os.makedirs(self.folder)
+        handle, download = tempfile.mkstemp('.download', '', self.folder)
+        os.close(handle)
+        try:
+            _urlretrieve(source, download)
+            digest = hashlib.sha1()
+            with open(download, 'rb') as f:
+                for block in iter(lambda: f.read(65536), b''):
+                    digest.update(block)
+            extension = os.path.splitext(source.split('?')[0].split('#')[0])[1][:8]
+            filename = digest.hexdigest() + extension
+            path = self._write(filename, lambda tmp: os.rename(download, tmp))
+        finally:
+            # a failed download leaves nothing behind
+            if os.path.exists(download): os.remove(download)
+        self._entries()[url] = {'file': filename, 'bytes': os.path.getsize(path), 'fetched': int(time.time())}
+        self._save_manifest()
+        self.fetched += 1
+        return path
+
+    def preload(self, urls):
+        """
+        Downloads (if needed) and decodes every image in urls now, so using them later never waits on the
+        network or the disk; filenames and Surfaces in the list are loaded too
+        :param urls: a list of urls, filenames, or Surfaces
+        :return: a list of the loaded images, in the same order
+        """
+        return [_get_image(url)[0] for url in urls]
+
+    def __len__(self):
+        return len(self._entries())
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return 'AssetCache in %s with %d urls%s' % (self.folder, len(self), ' (offline)' if self.offline else '')
+
+
+__all__.append('AssetCache')
+
+# where images loaded from urls are kept
+_assets = AssetCache()
+
+
+def get_asset_cache():
+    """Returns the AssetCache that images loaded from urls go through"""
+    return _assets
+
+
+__all__.append('get_asset_cache')
+
+
+def set_asset_cache(cache):
+    """Replaces the AssetCache that images loaded from urls go through (to use another folder, or one that is
+    offline from the start); returns the old one"""
+    global _assets
+    old = _assets
+    _assets = cache
+    return old
+
+
+__all__.append('set_asset_cache')
+
+
+def preload(urls):
+    """Downloads and decodes a list of image urls (or files) ahead of time; see AssetCache.preload"""
+    return _assets.preload(urls)
+
+
+__all__.append('preload')
+
+
 def _image_from_url(url):
-    """a method for loading images from urls by first saving them locally"""
-    filename = os.path.basename(url)
-    if not os.path.exists(filename):
-        if '://' not in url: url = 'http://' + url
-        _urlretrieve(url, filename)
-    image, filename = _image_from_file(filename)
-    return image, filename
+    """a method for loading images from urls through the asset cache, which downloads each one only once"""
+    image = pygame.image.load(_assets.path(url)).convert_alpha()
+    _known_images.put(url, image, True)
+    _known_images.put((image.get_width(), image.get_height(), url), image, True)
+    return image, url
 
 
 def _image_from_file(filename):
     """a method for loading images from files"""
     image = pygame.image.load(filename).convert_alpha()
-    _known_images[filename] = image
-    _known_images[(image.get_width(), image.get_height(), filename)] = image
+    _known_images.put(filename, image, True)
+    _known_images.put((image.get_width(), image.get_height(), filename), image, True)
     return image, filename
 
 
@@ -89,8 +377,8 @@ def _get_image(thing):
     if type(thing) is str:
         if os.path.exists(thing): return _image_from_file(thing)
         return _image_from_url(thing)
-    _known_images[sid] = thing
-    _known_images[(thing.get_width(), thing.get_height(), sid)] = thing
+    _known_images.put(sid, thing)
+    _known_images.put((thing.get_width(), thing.get_height(), sid), thing)
     return thing, sid
 
 
@@ -109,7 +397,92 @@ def load_sprite_sheet(url_or_filename, rows, columns):
     return frames
 
 
-__all__ = ['load_sprite_sheet']
+__all__.append('load_sprite_sheet')
+
+
+class RotationBank(object):
+    """Every rotation of one image at a fixed angular step (like every 5 degrees), rendered ahead of time.
+    Once an image has a bank, SpriteBox.rotate uses the nearest baked frame instead of rotating the image itself."""
+
+    def __init__(self, image, step=5, flip=False, w=0, h=0, background=False):
+        """RotationBank("ship.png", 5) renders the 72 rotations of ship.png now;
+        with background=True they are rendered in another thread and ready becomes True when they are done"""
+        if step <= 0: raise Exception("step must be a positive number of degrees")
+        self.step = step
+        self.count = int(-(-360 // step))
+        self.frames = None
+        self.bytes = 0
+        base = _image(image, flip, w, h)
+        if background:
+            thread = threading.Thread(target=self._bake, args=(base,))
+            thread.daemon = True
+            thread.start()
+        else:
+            self._bake(base)
+
+    def _bake(self, base):
+        frames = [base] + [pygame.transform.rotozoom(base, i * self.step, 1) for i in range(1, self.count)]
+        self.bytes = sum(frame.get_width() * frame.get_height() * frame.get_bytesize() for frame in frames)
+        self.frames = frames
+
+    @property
+    def ready(self):
+        return self.frames is not None
+
+    def frame(self, angle):
+        """returns the baked image closest to the given angle (in degrees)"""
+        return self.frames[int(round(angle / self.step)) % self.count]
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return 'RotationBank of %d frames every %g degrees using %d bytes' % (self.count, self.step, self.bytes)
+
+
+__all__.append('RotationBank')
+
+# rotation banks by (image, flip, width, height) of the unrotated image
+_rotation_banks = {}
+
+
+def bake_rotations(image, step=5, flip=False, w=0, h=0, background=False):
+    """Renders every rotation of an image (a file, url, or Surface at the given size, or its own size if w and h are
+    0) step degrees apart, so that rotating SpriteBoxes showing it never has to render during the game.
+    Returns the RotationBank; its bytes field tells how much memory the frames use. Baking an image again at the
+    same step returns the bank it already has. Banks are kept until clear_rotation_banks is called."""
+    base = _image(image, flip, w, h)
+    key = (image, flip, base.get_width(), base.get_height())
+    bank = _rotation_banks.get(key)
+    if bank is None or bank.step != step:
+        bank = RotationBank(image, step, flip, w, h, background)
+        _rotation_banks[key] = bank
+    return bank
+
+
+__all__.append('bake_rotations')
+
+
+def clear_rotation_banks(image=None):
+    """Forgets the baked rotations of an image (every size and mirroring of it), or of every image if none is
+    given, so their memory can be reclaimed; SpriteBoxes showing it go back to rotating on demand.
+    Returns how many bytes of frames were let go."""
+    keys = [key for key in _rotation_banks if image is None or key[0] is image or key[0] == image]
+    freed = 0
+    for key in keys:
+        freed += _rotation_banks.pop(key).bytes
+    return freed
+
+
+__all__.append('clear_rotation_banks')
+
+
+def rotation_bank_bytes():
+    """How many bytes the frames of every baked rotation take up; they are not part of the image cache's budget"""
+    return sum(bank.bytes for bank in _rotation_banks.values())
+
+
+__all__.append('rotation_bank_bytes')
 
 
 def from_image(x, y, filename_or_url):
@@ -121,6 +494,34 @@ def from_image(x, y, filename_or_url):
 __all__.append('from_image')
 
 
+_known_colors = {}
+
+
+def get_color(color):
+    """Returns the pygame.Color for a color name like "red" or "#ff8000", converting each name only once: every
+    later call with the same name returns the same Color object, so treat it as read-only. Colors that are not
+    strings (a pygame.Color, an (r, g, b) tuple, ...) are returned unchanged."""
+    if type(color) is not str: return color
+    known = _known_colors.get(color)
+    if known is None:
+        known = _known_colors[color] = pygame.Color(color)
+    return known
+
+
+__all__.append('get_color')
+
+
+def add_color(name, color):
+    """Names a color so it can be used anywhere a color name can: add_color("enemy", (0, 100, 0)); an error if the
+    name is already a color"""
+    if name in _known_colors or name in pygame.color.THECOLORS:
+        raise Exception("There is already a color called " + repr(name))
+    _known_colors[name] = pygame.Color(*color) if type(color) is tuple else pygame.Color(color)
+
+
+__all__.append('add_color')
+
+
 def from_color(x, y, color, width, height):
     """Creates a SpriteBox object at the given location with the given color, width, and height"""
     return SpriteBox(x, y, None, color, width, height)
@@ -133,11 +534,10 @@ def from_circle(x, y, color, radius, *args):
     """Creates a SpriteBox object at the given location filled with a circle.
     from_circle(x,y,color,radius,color2,radius2,color3,radius3,...) works too; the largest circle must come first"""
     img = pygame.surface.Surface((radius * 2, radius * 2), pygame.SRCALPHA, 32)
-    if type(color) is str: color = pygame.Color(color)
+    color = get_color(color)
     pygame.draw.circle(img, color, (radius, radius), radius)
     for i in range(1, len(args), 2):
-        color = args[i - 1]
-        if type(color) is str: color = pygame.Color(color)
+        color = get_color(args[i - 1])
         pygame.draw.circle(img, color, (radius, radius), args[i])
     return SpriteBox(x, y, img, None)
 
@@ -150,34 +550,173 @@ def from_polygon(x, y, color, *pts):
     w = max(x for x, y in pts) - x0
     h = max(y for x, y in pts) - y0
     img = pygame.surface.Surface((w, h), pygame.SRCALPHA, 32)
-    if type(color) is str: color = pygame.Color(color)
+    color = get_color(color)
     pygame.draw.polygon(img, color, [(x - x0, y - y0) for x, y in pts])
     return SpriteBox(x, y, img, None)
 
 
+# fonts by (size, bold, italic), so text does not reload the font every time it is drawn
+_known_fonts = {}
+
+
+def get_font(font_size, bold=False, italic=False):
+    """Returns the default pygame font in the given size and style, loading it only the first time it is asked for"""
+    key = (font_size, bold, italic)
+    font = _known_fonts.get(key)
+    if font is None:
+        # always use default font. Earlier versions allowed others, but this proved platform-dependent
+        font = pygame.font.Font(None, font_size)
+        font.set_bold(bold)
+        font.set_italic(italic)
+        _known_fonts[key] = font
+    return font
+
+
+__all__.append('get_font')
+
+
+class TextRenderer(object):
+    """Draws text in one font and color by blitting pre-rendered glyphs side by side, so new text (like a score that
+    changes every tick) costs one blit per character instead of rasterizing the whole string.
+    Glyphs are rendered the first time each character is used; printable ASCII is rendered up front."""
+
+    def __init__(self, font_size, color, bold=False, italic=False, recent=64):
+        """TextRenderer(30, "white") makes a renderer for 30-point white text that also remembers the last 64
+        strings it drew"""
+        color = get_color(color)
+        self.font = get_font(font_size, bold, italic)
+        self.color = color
+        self.height = self.font.get_height()
+        self._glyphs = {}
+        self._recent = OrderedDict()
+        self._recent_limit = recent
+        for code in range(32, 127):
+            self._glyph(chr(code))
+
+    def _glyph(self, char):
+        glyph = self._glyphs.get(char)
+        if glyph is None:
+            metrics = self.font.metrics(char)[0]
+            advance = metrics[4] if metrics is not None else self.font.size(char)[0]
+            glyph = (self.font.render(char, True, self.color), advance)
+            self._glyphs[char] = glyph
+        return glyph
+
+    def render(self, text):
+        """returns a Surface with text drawn on it; the same Surface is returned for recently drawn text, so do not
+        draw on it"""
+        ans = self._recent.get(text)
+        if ans is not None:
+            self._recent.move_to_end(text)
+            return ans
+        glyphs = [self._glyph(char) for char in text]
+        width, x = 0, 0
+        for image, advance in glyphs:
+            width = max(width, x + image.get_width())
+            x += advance
+        ans = pygame.Surface((max(width, 1), self.height), pygame.SRCALPHA, 32)
+        x = 0
+        blits = []
+        for image, advance in glyphs:
+            blits.append((image, (x, 0)))
+            x += advance
+        ans.blits(blits, False)
+        self._recent[text] = ans
+        if len(self._recent) > self._recent_limit:
+            self._recent.popitem(last=False)
+        return ans
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return 'TextRenderer with %d glyphs' % len(self._glyphs)
+
+
+__all__.append('TextRenderer')
+
+# text renderers by (size, color, bold, italic)
+_text_renderers = {}
+
+
+def get_text_renderer(font_size, color, bold=False, italic=False):
+    """Returns the shared TextRenderer for the given font size, color, and style, making it the first time"""
+    color = get_color(color)
+    key = (font_size, tuple(color), bold, italic)
+    renderer = _text_renderers.get(key)
+    if renderer is None:
+        renderer = TextRenderer(font_size, color, bold, italic)
+        _text_renderers[key] = renderer
+    return renderer
+
+
+__all__.append('get_text_renderer')
+
+
+# whole strings rendered by font.render, by (text, size, color as an int, bold, italic); the least recently used are
+# forgotten once they pass the budget
+_known_texts = ImageCache(8 * 1024 * 1024)
+
+
+def _render_text(text, font_size, color, bold=False, italic=False):
+    """the text rendered in one piece by font.render, made the first time it is asked for; it is shared, so do not
+    draw on it"""
+    color = get_color(color)
+    key = (text, font_size, int(color), bold, italic)
+    image = _known_texts.get(key)
+    if image is None:
+        image = get_font(font_size, bold, italic).render(text, True, color)
+        _known_texts.put(key, image)
+    return image
+
+
 def from_text(x, y, text, font_size, color, bold=False, italic=False):
     """Creates a SpriteBox object at the given location with the given text as its content"""
-    # always use default font. Earlier versions allowed others, but this proved platform-dependent
-    font = pygame.font.Font(None, font_size)
-    font.set_bold(bold)
-    font.set_italic(italic)
-    if type(color) is str:
-        color = pygame.Color(color)
-    return from_image(x, y, font.render(text, True, color))
+    # each box gets its own copy, so drawing on one box's image leaves the others alone
+    return from_image(x, y, _render_text(text, font_size, color, bold, italic).copy())
 
 
 __all__.append('from_text')
 
 
+# the filled surfaces draw_many copies for color boxes, by (color as an int, width, height); the least recently
+# used are forgotten once they pass the budget
+_color_surfaces = ImageCache(4 * 1024 * 1024)
+
+
+def _color_surface(key, color, w, h, target):
+    """makes the shared surface filled with color at size w x h that draw_many copies for color boxes"""
+    image = pygame.Surface((max(0, int(w)), max(0, int(h))), 0, target)
+    image.fill(color)
+    _color_surfaces.put(key, image)
+    return image
+
+
 class Camera(object):
     """A camera defines what is visible. It has a width, height, full screen status,
     and can be moved. Moving a camera changes what is visible."""
     is_initialized = False
 
     #    __slots__ = ["_surface", "x", "y", "speedx", "speedy"]
-    def __init__(self, width, height, full_screen=False):
-        """Camera(pixelsWide, pixelsTall, False) makes a window; using True instead makes a full-screen display."""
+    def __init__(self, width, height, full_screen=False, dirty_rects=False, headless=False):
+        """Camera(pixelsWide, pixelsTall, False) makes a window; using True instead makes a full-screen display.
+        Camera(400, 600, dirty_rects=True) only sends the parts of the screen that were drawn or cleared to the
+        display each frame, which is much cheaper when most of the screen is plain background.
+        Camera(400, 600, headless=True) opens no window at all (for running games in tests and batch jobs)."""
         if Camera.is_initialized: raise Exception("You can only have one Camera at a time")
+        if headless:
+            # SDL's dummy video driver draws into memory only; the display has to restart to switch to it, and SDL
+            # only reads the setting while starting, so the program's own setting is put back right after
+            pygame.display.quit()
+            driver = os.environ.get('SDL_VIDEODRIVER')
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            try:
+                pygame.display.init()
+            finally:
+                if driver is None:
+                    del os.environ['SDL_VIDEODRIVER']
+                else:
+                    os.environ['SDL_VIDEODRIVER'] = driver
         # if height > 768: raise Exception("The Game Expo screens will only be 768 pixels tall")
         # if width > 1366: raise Exception("The Game Expo screens will only be 1366 pixels wide")
         if full_screen:
@@ -186,8 +725,21 @@ class Camera(object):
             self.__dict__['_surface'] = pygame.display.set_mode([width, height])
         self.__dict__['_x'] = 0
         self.__dict__['_y'] = 0
+        # screen rects drawn this frame (None when not using dirty rects), drawn last frame, and erased this frame
+        self.__dict__['_dirty'] = [] if dirty_rects else None
+        self.__dict__['_last_dirty'] = []
+        self.__dict__['_erased'] = []
+        self.__dict__['_clear_color'] = None
+        self.__dict__['pixels_pushed'] = 0
         Camera.is_initialized = True
 
+    def use_dirty_rects(self, on=True):
+        """camera.use_dirty_rects() turns on sending only drawn and erased regions to the display; False turns it off"""
+        self.__dict__['_dirty'] = [] if on else None
+        self.__dict__['_last_dirty'] = []
+        self.__dict__['_erased'] = []
+        self.__dict__['_clear_color'] = None
+
     def move(self, x, y=None):
         """camera.move(3, -7) moves the screen's center to be 3 more pixels to the right and 7 more up"""
         if y is None: x, y = x
@@ -195,18 +747,21 @@ class Camera(object):
         self.y += y
 
     def draw(self, thing, *args):
-        """camera.draw(box) draws the provided SpriteBox object
+        """camera.draw(box) draws the provided SpriteBox object (or EntityPool, PoolSprite, or Widget)
         camera.draw(image, x, y) draws the provided image centered at the provided coordinates
         camera.draw("Hi", 12, "red", x, y) draws the text Hi in a red 12-point font at x,y"""
         if isinstance(thing, SpriteBox):
             thing.draw(self)
+        elif isinstance(thing, (EntityPool, PoolSprite, Widget)):
+            thing.draw(self)
         elif isinstance(thing, pygame.Surface):
             try:
                 if len(args) == 1:
                     x, y = args[0]
                 else:
                     x, y = args[:2]
-                self._surface.blit(thing, [x - thing.get_width() / 2, y - thing.get_height() / 2])
+                region = self._surface.blit(thing, [x - thing.get_width() / 2, y - thing.get_height() / 2])
+                if self._dirty is not None: self._dirty.append(region)
                 ok = True
             except BaseException as e:
                 ok = False
@@ -216,8 +771,7 @@ class Camera(object):
             try:
                 size = args[0]
                 color = args[1]
-                if type(color) is str: color = pygame.Color(color)
-                self.draw(pygame.font.Font(None, size).render(thing, True, color), *args[2:])
+                self.draw(_render_text(thing, size, color), *args[2:])
                 ok = True
             except BaseException as e:
                 ok = False
@@ -226,14 +780,77 @@ class Camera(object):
         else:
             raise Exception("I don't know how to draw a ", type(thing))
 
+    def draw_many(self, things):
+        """camera.draw_many(boxes) draws every SpriteBox in boxes that is at least partly on screen, in order.
+        Boxes off screen are skipped in the same pass and everything else is drawn with a single Surface.blits
+        call; a color box is drawn as a copy of a filled surface shared by every box of its color and size, which
+        is much faster than filling its rectangle. So this is much faster than calling draw on each one.
+        Anything that is not a SpriteBox is passed to draw(...) as usual."""
+        surface = self._surface
+        cx, cy = self._x, self._y
+        width, height = surface.get_width(), surface.get_height()
+        dirty = self._dirty
+        color_surfaces = _color_surfaces
+        blits = []
+        for thing in things:
+            if not isinstance(thing, SpriteBox):
+                self.draw(thing)
+                continue
+            w, h = thing._w, thing._h
+            left, top = thing.x - w / 2 - cx, thing.y - h / 2 - cy
+            if left > width or top > height or left + w < 0 or top + h < 0:
+                continue
+            color = thing._color
+            if color is not None:
+                key = (int(color), w, h)
+                image = color_surfaces.get(key)
+                if image is None: image = _color_surface(key, color, w, h, surface)
+                blits.append((image, (left, top)))
+            elif thing._image is not None:
+                blits.append((thing._image, (left, top)))
+        if _profiler.enabled:
+            _profiler.count('blits', len(blits))
+        if blits:
+            regions = surface.blits(blits, dirty is not None)
+            if dirty is not None: dirty.extend(regions)
+
     def display(self):
-        """Causes what has been drawn recently by calls to draw(...) to be displayed on the screen"""
-        pygame.display.flip()
+        """Causes what has been drawn recently by calls to draw(...) to be displayed on the screen
+        With dirty rects on, only the regions drawn or erased since the last display are sent.
+        Either way, camera.pixels_pushed tells how many pixels were sent."""
+        if self._dirty is None:
+            pygame.display.flip()
+            self.__dict__['pixels_pushed'] = self.width * self.height
+            _profiler.count('pixels pushed', self.width * self.height)
+            return
+        rects = _merge_rects(self._dirty + self._erased, self._surface.get_rect())
+        pushed = sum(rect.width * rect.height for rect in rects)
+        if pushed * 4 >= self.width * self.height * 3:
+            # when most of the screen changed anyway, one full flip is cheaper than many rects
+            pygame.display.flip()
+            pushed = self.width * self.height
+        elif rects:
+            pygame.display.update(rects)
+        self.__dict__['pixels_pushed'] = pushed
+        _profiler.count('pixels pushed', pushed)
+        self.__dict__['_last_dirty'] = self._dirty
+        self.__dict__['_dirty'] = []
+        self.__dict__['_erased'] = []
 
     def clear(self, color):
-        """Erases the screen by filling it with the given color"""
-        if type(color) is str: color = pygame.Color(color)
-        self._surface.fill(color)
+        """Erases the screen by filling it with the given color
+        With dirty rects on, only what was drawn last frame is erased (the rest is already that color)."""
+        color = get_color(color)
+        if self._dirty is None:
+            self._surface.fill(color)
+        elif self._clear_color is not None and tuple(color) == self._clear_color:
+            for rect in self._last_dirty:
+                self._erased.append(self._surface.fill(color, rect))
+            self.__dict__['_last_dirty'] = []
+        else:
+            self._erased.append(self._surface.fill(color))
+            self.__dict__['_clear_color'] = tuple(color)
+            self.__dict__['_last_dirty'] = []
 
     def __getattr__(self, name):
         if name in self.__dict__: return self.__dict__[name]
@@ -319,17 +936,40 @@ class Camera(object):
 __all__.append('Camera')
 
 
+def _merge_rects(rects, bounds):
+    """clips rects to bounds and joins any that overlap, so the display is sent each pixel at most once or so"""
+    merged = []
+    for rect in rects:
+        rect = rect.clip(bounds)
+        if rect.width == 0 or rect.height == 0: continue
+        hit = rect.collidelist(merged)
+        while hit != -1:
+            rect.union_ip(merged.pop(hit))
+            hit = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
 class SpriteBox(object):
     """Intended to represent a sprite (i.e., an image that can be drawn as part of a larger view) and the box that
     contains it. Has various collision and movement methods built in. """
 
-    #    __slots__ = ["x","y","speedx","speedy","_w","_h","_key","_image","_color"]
+    # position, speed and size live in slots and the derived values (left, center, size, ...) are properties, so
+    # reading an edge is a plain attribute lookup; '__dict__' is kept so games can still add their own fields
+    __slots__ = ["x", "y", "speedx", "speedy", "dead", "_w", "_h", "_key", "_image", "_color", "__dict__"]
+
     def __init__(self, x, y, image, color, w=None, h=None):
         """You should probably use the from_image, from_text, or from_color method instead of this one"""
-        self.__dict__['x'] = x
-        self.__dict__['y'] = y
-        self.__dict__['speedx'] = 0
-        self.__dict__['speedy'] = 0
+        self.x = x
+        self.y = y
+        self.speedx = 0
+        self.speedy = 0
+        self.dead = False
+        self._key = None
+        self._image = None
+        self._color = None
+        self._w = 0
+        self._h = 0
         if image is not None:
             self._set_key(image, False, 0, 0, 0)
             if w is not None:
@@ -341,10 +981,8 @@ class SpriteBox(object):
                 self.height = h
         elif color is not None:
             if w is None or h is None: raise Exception("must supply size of color box")
-            self.__dict__['_key'] = None
-            self.__dict__['_image'] = None
-            self.__dict__['_w'] = w
-            self.__dict__['_h'] = h
+            self._w = w
+            self._h = h
             self.color = color
         pass
 
@@ -356,110 +994,168 @@ class SpriteBox(object):
         if width == 0 and height == 0:
             width = unrot.get_width()
             height = unrot.get_height()
-        self.__dict__['_key'] = (name, flip, width, height, angle)
-        self.__dict__['_image'] = _image(*self.__dict__['_key'])
-        self.__dict__['_color'] = None
-        self.__dict__['_w'] = self.__dict__['_image'].get_width()
-        self.__dict__['_h'] = self.__dict__['_image'].get_height()
+        self._key = (name, flip, width, height, angle)
+        bank = _rotation_banks.get((name, flip, width, height)) if _rotation_banks else None
+        if bank is not None and bank.ready:
+            self._image = bank.frame(angle)
+        else:
+            self._image = _image(*self._key)
+        self._color = None
+        self._w = self._image.get_width()
+        self._h = self._image.get_height()
 
-    def __getattr__(self, name):
-        x, y, w, h = self.x, self.y, self._w, self._h
-        if name == 'xspeed':
-            name = 'speedx'
-        if name == 'yspeed':
-            name = 'speedy'
-        if name == 'left':
-            return x - w / 2
-        if name == 'right':
-            return x + w / 2
-        if name == 'top':
-            return y - h / 2
-        if name == 'bottom':
-            return y + h / 2
-        if name == 'center':
-            return x, y
-        if name == 'topleft':
-            return x - w / 2, y - h / 2
-        if name == 'topright':
-            return x + w / 2, y - h / 2
-        if name == 'bottomleft':
-            return x - w / 2, y + h / 2
-        if name == 'bottomright':
-            return x + w / 2, y + h / 2
-        if name == 'width':
-            return w
-        if name == 'height':
-            return h
-        if name == 'width':
-            return w
-        if name == 'height':
-            return h
-        if name == 'size':
-            return w, h
-        if name == 'speed':
-            return self.speedx, self.speedy
-        if name == 'rect':
-            return pygame.Rect(self.topleft, self.size)
-        if name == 'image':
-            return self.__dict__['_image']
-        if name in self.__dict__:
-            return self.__dict__[name]
-        raise Exception("There is no '" + name + "' in a SpriteBox object")
+    @property
+    def xspeed(self):
+        return self.speedx
 
-    def __setattr__(self, name, value):
-        w, h = self._w, self._h
-        if name == 'xspeed':
-            name = 'speedx'
-        if name == 'yspeed':
-            name = 'speedy'
-        if name in self.__dict__:
-            self.__dict__[name] = value
-        elif name == 'left':
-            self.x = value + w / 2
-        elif name == 'right':
-            self.x = value - w / 2
-        elif name == 'top':
-            self.y = value + h / 2
-        elif name == 'bottom':
-            self.y = value - h / 2
-        elif name == 'center':
-            self.x, self.y = value[0], value[1]
-        elif name == 'topleft':
-            self.x, self.y = value[0] + w / 2, value[1] + h / 2
-        elif name == 'topright':
-            self.x, self.y = value[0] - w / 2, value[1] + h / 2
-        elif name == 'bottomleft':
-            self.x, self.y = value[0] + w / 2, value[1] - h / 2
-        elif name == 'bottomright':
-            self.x, self.y = value[0] - w / 2, value[1] - h / 2
-        elif name == 'width':
-            self.scale_by(value / w)
-        elif name == 'height':
-            self.scale_by(value / h)
-        elif name == 'size':
-            if self.__dict__['_image'] is not None:
-                key = self.__dict__['_key']
-                self._set_key(key[0], key[1], value[0], value[1], key[4])
-            else:
-                self.__dict__['_w'] = value[0]
-                self.__dict__['_h'] = value[1]
-        elif name == 'speed':
-            self.speedx, self.speedy = value[0], value[1]
-        elif name == 'color':
-            self.__dict__['_image'] = None
-            self.__dict__['_key'] = None
-            if type(value) is str: value = pygame.Color(value)
-            self.__dict__['_color'] = value
-        elif name == 'image':
-            self.__dict__['_color'] = None
-            if self.__dict__['_key'] is None:
-                self._set_key(value, False, w, h, 0)
-            else:
-                key = self.__dict__['_key']
-                self._set_key(value, *key[1:])
+    @xspeed.setter
+    def xspeed(self, value):
+        self.speedx = value
+
+    @property
+    def yspeed(self):
+        return self.speedy
+
+    @yspeed.setter
+    def yspeed(self, value):
+        self.speedy = value
+
+    @property
+    def left(self):
+        return self.x - self._w / 2
+
+    @left.setter
+    def left(self, value):
+        self.x = value + self._w / 2
+
+    @property
+    def right(self):
+        return self.x + self._w / 2
+
+    @right.setter
+    def right(self, value):
+        self.x = value - self._w / 2
+
+    @property
+    def top(self):
+        return self.y - self._h / 2
+
+    @top.setter
+    def top(self, value):
+        self.y = value + self._h / 2
+
+    @property
+    def bottom(self):
+        return self.y + self._h / 2
+
+    @bottom.setter
+    def bottom(self, value):
+        self.y = value - self._h / 2
+
+    @property
+    def center(self):
+        return self.x, self.y
+
+    @center.setter
+    def center(self, value):
+        self.x, self.y = value[0], value[1]
+
+    @property
+    def topleft(self):
+        return self.x - self._w / 2, self.y - self._h / 2
+
+    @topleft.setter
+    def topleft(self, value):
+        self.x, self.y = value[0] + self._w / 2, value[1] + self._h / 2
+
+    @property
+    def topright(self):
+        return self.x + self._w / 2, self.y - self._h / 2
+
+    @topright.setter
+    def topright(self, value):
+        self.x, self.y = value[0] - self._w / 2, value[1] + self._h / 2
+
+    @property
+    def bottomleft(self):
+        return self.x - self._w / 2, self.y + self._h / 2
+
+    @bottomleft.setter
+    def bottomleft(self, value):
+        self.x, self.y = value[0] + self._w / 2, value[1] - self._h / 2
+
+    @property
+    def bottomright(self):
+        return self.x + self._w / 2, self.y + self._h / 2
+
+    @bottomright.setter
+    def bottomright(self, value):
+        self.x, self.y = value[0] - self._w / 2, value[1] - self._h / 2
+
+    @property
+    def width(self):
+        return self._w
+
+    @width.setter
+    def width(self, value):
+        self.scale_by(value / self._w)
+
+    @property
+    def height(self):
+        return self._h
+
+    @height.setter
+    def height(self, value):
+        self.scale_by(value / self._h)
+
+    @property
+    def size(self):
+        return self._w, self._h
+
+    @size.setter
+    def size(self, value):
+        if self._image is not None:
+            key = self._key
+            self._set_key(key[0], key[1], value[0], value[1], key[4])
         else:
-            # sys.stderr.write("INFO: added \"" + name + "\" to box")
-            self.__dict__[name] = value
+            self._w = value[0]
+            self._h = value[1]
+
+    @property
+    def speed(self):
+        return self.speedx, self.speedy
+
+    @speed.setter
+    def speed(self, value):
+        self.speedx, self.speedy = value[0], value[1]
+
+    @property
+    def rect(self):
+        return pygame.Rect(self.topleft, self.size)
+
+    @property
+    def color(self):
+        # a copy, because boxes share one Color per color name and changing it would recolor all of them
+        return None if self._color is None else pygame.Color(self._color)
+
+    @color.setter
+    def color(self, value):
+        self._image = None
+        self._key = None
+        self._color = get_color(value)
+
+    @property
+    def image(self):
+        return self._image
+
+    @image.setter
+    def image(self, value):
+        self._color = None
+        if self._key is None:
+            self._set_key(value, False, self._w, self._h, 0)
+        else:
+            key = self._key
+            self._set_key(value, *key[1:])
 
     def overlap(self, other, padding=0, padding2=None):
         """b1.overlap(b1) returns a list of 2 values such that self.move(result) will cause them to not overlap
@@ -488,6 +1184,10 @@ class SpriteBox(object):
         b1.touches(b2, 5) adds a 5-pixel padding to b1 before computing the touch
         b1.touches(b2, 5, 10) adds a 5-pixel padding in x and a 10-pixel padding in y before computing the touch"""
         if padding2 is None: padding2 = padding
+        if isinstance(other, SpriteBox):
+            # same test as below, written on the centers and sizes to skip the edge properties
+            return (abs(other.x - self.x) * 2 <= other._w + self._w + 2 * padding and
+                    abs(other.y - self.y) * 2 <= other._h + self._h + 2 * padding2)
         l = other.left - self.right - padding
         r = self.left - other.right - padding
         t = other.top - self.bottom - padding2
@@ -553,10 +1253,14 @@ class SpriteBox(object):
         """change position by the current speed field of the SpriteBox object"""
         self.move(self.speedx, self.speedy)
 
+    def kill(self):
+        """marks this SpriteBox as dead; remove_dead(list) later takes all dead boxes out of a list at once"""
+        self.dead = True
+
     def full_size(self):
         """change size of this SpriteBox to be the original size of the source image"""
-        if self.__dict__['_key'] is None: return
-        key = self.__dict__['_key']
+        if self._key is None: return
+        key = self._key
         self._set_key(key[0], key[1], 0, 0, key[4])
 
     def __repr__(self):
@@ -576,47 +1280,1405 @@ class SpriteBox(object):
     def scale_by(self, multiplier):
         """Change the size of this SpriteBox by the given factor
         b1.scale_by(1) does nothing; b1.scale_by(0.4) makes b1 40% of its original width and height."""
-        if self.__dict__['_key'] is None:
+        if self._key is None:
             self._w *= multiplier
             self._h *= multiplier
         else:
-            key = self.__dict__['_key']
+            key = self._key
             self._set_key(key[0], key[1], key[2] * multiplier, key[3] * multiplier, key[4])
 
     def draw(self, surface):
         """b1.draw(camera) is the same as saying camera.draw(b1)
         b1.draw(image) draws a copy of b1 on the image proivided"""
         if isinstance(surface, Camera):
-            if self.__dict__['_color'] is not None:
+            if self._color is not None:
                 region = self.rect.move(-surface._x, -surface._y)
                 region = region.clip(surface._surface.get_rect())
-                surface._surface.fill(self._color, region)
-            elif self.__dict__['_image'] is not None:
-                surface._surface.blit(self._image, [self.left - surface._x, self.top - surface._y])
+                region = surface._surface.fill(self._color, region)
+                if surface._dirty is not None: surface._dirty.append(region)
+            elif self._image is not None:
+                region = surface._surface.blit(self._image, [self.left - surface._x, self.top - surface._y])
+                if surface._dirty is not None: surface._dirty.append(region)
         else:
-            if self.__dict__['_color'] is not None:
+            if self._color is not None:
                 surface.fill(self._color, self.rect)
-            elif self.__dict__['_image'] is not None:
+            elif self._image is not None:
                 surface.blit(self._image, self.topleft)
 
+    def bake_rotations(self, step=5, background=False):
+        """Renders every rotation of this SpriteBox's image at its current size and mirroring, step degrees apart,
+        so rotate never has to render during the game; afterwards rotate snaps to the nearest baked angle.
+        Returns the RotationBank (see bake_rotations)."""
+        if self._key is None: return None
+        key = self._key
+        bank = bake_rotations(key[0], step, key[1], key[2], key[3], background)
+        self._set_key(*key)
+        return bank
+
     def flip(self):
         """mirrors the SpriteBox left-to-right.
         Mirroring top-to-bottom can be accomplished by
             b1.rotate(180)
             b1.flip()"""
-        if self.__dict__['_key'] is None: return
-        key = self.__dict__['_key']
+        if self._key is None: return
+        key = self._key
         self._set_key(key[0], not key[1], *key[2:])
 
     def rotate(self, angle):
         """Rotates the SpriteBox by the given angle (in degrees)."""
-        if self.__dict__['_key'] is None: return
-        key = self.__dict__['_key']
+        if self._key is None: return
+        key = self._key
         self._set_key(key[0], key[1], key[2], key[3], key[4] + angle)
 
 
 __all__.append('SpriteBox')
 
+
+class Animation(object):
+    """The frames of one animation, scaled and mirrored once when it is made and kept in a list in the order they
+    are shown (a ping-pong animation's way back is stored too), so showing the next frame is just moving an index.
+    Share one Animation between every box that plays it.
+    ----
+    walk = gamebox.Animation(gamebox.load_sprite_sheet("walk.png", 1, 8), 4)  # a new frame every 4 ticks
+    ----
+    mode is 'loop' (start over after the last frame), 'ping-pong' (play backwards to the first frame, then forwards
+    again) or 'once' (stop on the last frame)."""
+
+    modes = ('loop', 'ping-pong', 'once')
+
+    def __init__(self, frames, ticks_per_frame=1, mode='loop', flip=False, w=0, h=0):
+        """frames: a list of images (files, urls, or Surfaces, like the list load_sprite_sheet returns);
+        every frame is mirrored if flip is True and scaled to w by h unless both are 0"""
+        if mode not in self.modes: raise Exception("mode must be one of " + ", ".join(self.modes))
+        if ticks_per_frame < 1: raise Exception("ticks_per_frame must be at least 1")
+        if not frames: raise Exception("an animation needs at least one frame")
+        self.source = list(frames)
+        self.ticks_per_frame = int(ticks_per_frame)
+        self.mode = mode
+        self.flip = flip
+        self.w, self.h = int(w + 0.5), int(h + 0.5)
+        # the size every frame was scaled to, or 0, 0 if they kept their own sizes
+        images = [_image(frame, flip, self.w, self.h) for frame in self.source]
+        if mode == 'ping-pong':
+            images += images[-2:0:-1]
+        self.frames = images
+        self.sizes = [(image.get_width(), image.get_height()) for image in images]
+        self._variants = {(flip, self.w, self.h): self}
+
+    def variant(self, flip, w=0, h=0):
+        """The same animation mirrored and sized differently; each variant is made once and then reused"""
+        key = (flip, int(w + 0.5), int(h + 0.5))
+        found = self._variants.get(key)
+        if found is None:
+            found = Animation(self.source, self.ticks_per_frame, self.mode, flip, w, h)
+            found._variants = self._variants
+            self._variants[key] = found
+        return found
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return 'Animation with %d frames, %d ticks each, %s' % (len(self.frames), self.ticks_per_frame, self.mode)
+
+
+__all__.append('Animation')
+
+
+class AnimatedSpriteBox(SpriteBox):
+    """A SpriteBox that plays an Animation. Call advance() once a tick; it moves to the next frame every
+    animation.ticks_per_frame ticks by picking it out of the animation's list, without looking anything up in the
+    image cache or scaling anything.
+    flip, scale_by, full_size and changing the size switch to a variant of the animation (made the first time it is
+    needed). Rotating (and baking rotations) is not supported, and what it shows is changed with play rather than by setting image or color; all
+    three raise an exception."""
+
+    __slots__ = ["animation", "frame", "finished", "_ticks"]
+
+    def __init__(self, x, y, animation):
+        SpriteBox.__init__(self, x, y, None, None)
+        self.animation = None
+        self.play(animation)
+
+    def play(self, animation, restart=True):
+        """starts showing animation from its first frame; with restart=False, an animation that is already playing
+        keeps going"""
+        if animation is self.animation and not restart: return
+        self.animation = animation
+        self.frame = 0
+        self.finished = False
+        self._ticks = 0
+        self._show(0)
+
+    def _show(self, frame):
+        self.frame = frame
+        self._image = self.animation.frames[frame]
+        self._w, self._h = self.animation.sizes[frame]
+
+    def advance(self, ticks=1):
+        """moves the animation along by ticks; returns True once an animation in 'once' mode has shown its last
+        frame for its full time"""
+        if self.finished: return True
+        self._ticks += ticks
+        animation = self.animation
+        if self._ticks < animation.ticks_per_frame: return False
+        steps, self._ticks = divmod(self._ticks, animation.ticks_per_frame)
+        frame = self.frame + steps
+        count = len(animation.frames)
+        if frame >= count:
+            if animation.mode == 'once':
+                frame = count - 1
+                self.finished = True
+            else:
+                frame %= count
+        self._show(frame)
+        return self.finished
+
+    def _switch(self, flip, w, h):
+        self.animation = self.animation.variant(flip, w, h)
+        self._show(self.frame)
+
+    @property
+    def size(self):
+        return self._w, self._h
+
+    @size.setter
+    def size(self, value):
+        self._switch(self.animation.flip, value[0], value[1])
+
+    def scale_by(self, multiplier):
+        """Change the size of every frame by the given factor"""
+        self._switch(self.animation.flip, self._w * multiplier, self._h * multiplier)
+
+    def flip(self):
+        """mirrors every frame left-to-right"""
+        animation = self.animation
+        self._switch(not animation.flip, animation.w, animation.h)
+
+    def full_size(self):
+        """change size of every frame back to the original size of the animation's images"""
+        self._switch(self.animation.flip, 0, 0)
+
+    @property
+    def image(self):
+        return self._image
+
+    @image.setter
+    def image(self, value):
+        raise Exception("An AnimatedSpriteBox shows its animation's frames; use play(...) to show another animation")
+
+    @property
+    def color(self):
+        return None
+
+    @color.setter
+    def color(self, value):
+        raise Exception("An AnimatedSpriteBox shows its animation's frames; use play(...) to show another animation")
+
+    def rotate(self, angle):
+        """not supported for animations; raises an exception"""
+        raise Exception("AnimatedSpriteBoxes can't be rotated; bake the rotation into the animation's frames")
+
+    def bake_rotations(self, step=5, background=False):
+        """not supported for animations; raises an exception"""
+        raise Exception("AnimatedSpriteBoxes can't be rotated; bake the rotation into the animation's frames")
+
+    def copy_at(self, newx, newy):
+        """Make a new AnimatedSpriteBox playing the same animation, at the same frame, at the given location"""
+        box = AnimatedSpriteBox(newx, newy, self.animation)
+        box._ticks = self._ticks
+        box.finished = self.finished
+        box._show(self.frame)
+        return box
+
+
+__all__.append('AnimatedSpriteBox')
+
+
+def remove_dead(boxes, pool=None):
+    """Takes every box whose dead flag is set (see SpriteBox.kill) out of the list in one pass, keeping the rest in
+    order. Killing boxes while looping over a list and calling this afterwards is safe, unlike list.remove, which
+    skips the box after each one removed and has to search the list every time.
+    If pool is given, the removed boxes are released to it to be used again.
+    Returns how many boxes were removed."""
+    kept = [box for box in boxes if not box.dead]
+    removed = len(boxes) - len(kept)
+    if removed:
+        if pool is not None:
+            for box in boxes:
+                if box.dead: pool.release(box)
+        boxes[:] = kept
+    return removed
+
+
+__all__.append('remove_dead')
+
+
+class Pool(object):
+    """Keeps things that are made and thrown away all the time (bullets, pickups, ...) to be used again, so a long
+    game doesn't keep making new objects for the garbage collector to clean up.
+    make() makes a new one when none are free; reset(thing, ...) gets a new or reused one ready, given the
+    arguments passed to acquire.
+    ----
+    bullets = gamebox.color_box_pool()
+    bullet = bullets.acquire(x, y, "white", 5, 5)  # like from_color(x, y, "white", 5, 5)
+    ...
+    bullet.kill()
+    gamebox.remove_dead(bullet_list, bullets)  # releases the dead bullets back to the pool
+    ----"""
+
+    def __init__(self, make, reset=None, size=0):
+        """size: how many to make right away"""
+        self.make = make
+        self.reset = reset
+        self.made = 0
+        self.reused = 0
+        self.high_water = 0
+        self._free = []
+        self._out = {}
+        # the things acquired and not yet released, by id
+        self.fill(size)
+
+    @property
+    def in_use(self):
+        return len(self._out)
+
+    def fill(self, count):
+        """makes count more things ahead of time"""
+        for _ in range(count):
+            self._free.append(self.make())
+        self.made += count
+
+    def acquire(self, *args, **kwargs):
+        """returns a free thing (or a new one if none are free), reset with the given arguments"""
+        if self._free:
+            thing = self._free.pop()
+            self.reused += 1
+        else:
+            thing = self.make()
+            self.made += 1
+        if self.reset is not None: self.reset(thing, *args, **kwargs)
+        self._out[id(thing)] = thing
+        if len(self._out) > self.high_water: self.high_water = len(self._out)
+        return thing
+
+    def release(self, thing):
+        """gives a thing back to be reused; it must not be used again until acquire returns it.
+        Releasing something twice, or something that didn't come from this pool, raises an exception instead of
+        letting two owners get the same thing later."""
+        if self._out.pop(id(thing), None) is not thing:
+            raise Exception("released something that was not acquired from this pool, or was already released")
+        self._free.append(thing)
+
+    def release_all(self, things):
+        """releases every thing in a list (and empties the list)"""
+        for thing in things:
+            self.release(thing)
+        del things[:]
+
+    def stats(self):
+        """how many things have been made and reused, how many are in use and free, and the most ever in use"""
+        return {'made': self.made, 'reused': self.reused, 'in use': self.in_use, 'free': len(self._free),
+                'high water': self.high_water}
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return 'Pool with %d in use and %d free' % (self.in_use, len(self._free))
+
+
+__all__.append('Pool')
+
+
+def _reset_color_box(box, x, y, color, width, height):
+    box.x = x
+    box.y = y
+    box.speedx = 0
+    box.speedy = 0
+    box.dead = False
+    box._w = width
+    box._h = height
+    box._image = None
+    box._key = None
+    box._color = get_color(color)
+
+
+def color_box_pool(size=0):
+    """A Pool of color boxes: pool.acquire(x, y, color, width, height) works like from_color(x, y, color, width,
+    height), with the speed set to 0 and the box not dead. Fields a game added to a reused box are left as they
+    were, so set them again after acquiring."""
+    return Pool(lambda: SpriteBox(0, 0, None, (0, 0, 0), 1, 1), _reset_color_box, size)
+
+
+__all__.append('color_box_pool')
+
+
+# how far across and down the widget each anchor point is
+_widget_anchors = {'topleft': (0, 0), 'topright': (1, 0), 'bottomleft': (0, 1), 'bottomright': (1, 1),
+                   'center': (0.5, 0.5), 'midtop': (0.5, 0), 'midbottom': (0.5, 1)}
+
+
+class Widget(object):
+    """Something drawn at a fixed spot on the screen rather than in the world, so it stays put as the camera moves
+    (a score, a health bar, ...). x and y are screen pixels and anchor says which point of the widget sits there:
+    'topleft', 'topright', 'bottomleft', 'bottomright', 'center', 'midtop', or 'midbottom'.
+    Widgets keep their picture between frames and only redraw it when their value changes."""
+
+    def __init__(self, x, y, anchor='topleft'):
+        self.x = x
+        self.y = y
+        self.anchor = anchor
+        self.image = None
+
+    @property
+    def width(self):
+        return self.image.get_width() if self.image is not None else 0
+
+    @property
+    def height(self):
+        return self.image.get_height() if self.image is not None else 0
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    @property
+    def topleft(self):
+        """the screen position of the widget's top left corner"""
+        fx, fy = _widget_anchors[self.anchor]
+        return self.x - self.width * fx, self.y - self.height * fy
+
+    def draw(self, camera):
+        """w.draw(camera) is the same as saying camera.draw(w)"""
+        if self.image is not None:
+            region = camera._surface.blit(self.image, self.topleft)
+            if camera._dirty is not None: camera._dirty.append(region)
+
+
+__all__.append('Widget')
+
+
+class Label(Widget):
+    """A line of on-screen text that is only re-rendered when the text changes.
+    label.text = "Score: " + str(score) each tick is cheap when the score has not changed."""
+
+    def __init__(self, x, y, font_size, color, text="", anchor='topleft', bold=False, italic=False):
+        """Label(0, 0, 30, "white", "Score: 0") makes 30-point white text with its top left at the screen's corner"""
+        Widget.__init__(self, x, y, anchor)
+        self._renderer = get_text_renderer(font_size, color, bold, italic)
+        self._text = None
+        self.text = text
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        value = str(value)
+        if value != self._text:
+            self._text = value
+            self.image = self._renderer.render(value)
+
+
+__all__.append('Label')
+
+
+class Gauge(Widget):
+    """An on-screen bar (like a health bar) filled in proportion to value / maximum; only redrawn when the filled
+    length in pixels changes. Vertical gauges fill from the bottom, horizontal ones from the left."""
+
+    def __init__(self, x, y, width, height, color, background="black", outline=None, border=0, value=1, maximum=1,
+                 vertical=False, anchor='topleft'):
+        """Gauge(0, 600, 20, 150, "red", "black", "white", 2, vertical=True, anchor='bottomleft') makes a red bar
+        with a white border in the bottom left of a 600-pixel-tall screen"""
+        Widget.__init__(self, x, y, anchor)
+        color = get_color(color)
+        background = get_color(background)
+        outline = get_color(outline)
+        self.color, self.background, self.outline, self.border = color, background, outline, border
+        self.vertical = vertical
+        self.maximum = maximum
+        self.image = pygame.Surface((width, height))
+        self._filled = None
+        self._value = None
+        self.value = value
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        border = self.border
+        inner_w, inner_h = self.width - 2 * border, self.height - 2 * border
+        fraction = min(max(value / self.maximum, 0), 1) if self.maximum else 0
+        filled = int(fraction * (inner_h if self.vertical else inner_w))
+        if filled != self._filled:
+            self._filled = filled
+            image = self.image
+            image.fill(self.outline if self.outline is not None else self.background)
+            image.fill(self.background, (border, border, inner_w, inner_h))
+            if self.vertical:
+                image.fill(self.color, (border, border + inner_h - filled, inner_w, filled))
+            else:
+                image.fill(self.color, (border, border, filled, inner_h))
+
+
+__all__.append('Gauge')
+
+
+class WidgetStack(Widget):
+    """Lines up several widgets one under another (for example a score with a multiplier below it), keeping them
+    aligned on the stack's anchor side as their sizes change."""
+
+    def __init__(self, x, y, widgets=(), anchor='topleft', spacing=0):
+        Widget.__init__(self, x, y, anchor)
+        self.spacing = spacing
+        self.widgets = list(widgets)
+
+    def add(self, widget):
+        """puts widget at the bottom of the stack and returns it"""
+        self.widgets.append(widget)
+        return widget
+
+    @property
+    def width(self):
+        return max([widget.width for widget in self.widgets] or [0])
+
+    @property
+    def height(self):
+        return sum(widget.height for widget in self.widgets) + self.spacing * max(len(self.widgets) - 1, 0)
+
+    def draw(self, camera):
+        """lays out and draws each widget in the stack"""
+        left, top = self.topleft
+        fx = _widget_anchors[self.anchor][0]
+        x = left + self.width * fx
+        for widget in self.widgets:
+            widget.x, widget.y, widget.anchor = x, top, ('topleft', 'midtop', 'topright')[int(fx * 2)]
+            widget.draw(camera)
+            top += widget.height + self.spacing
+
+
+__all__.append('WidgetStack')
+
+
+class SpatialGrid(object):
+    """A uniform grid that buckets SpriteBoxes by the cells they cover, so finding which boxes might touch a given
+    box only looks at nearby cells instead of every box. Boxes are not tracked as they move; rebuild the grid
+    (usually once per tick) after moving them."""
+
+    def __init__(self, cell_size=64, boxes=()):
+        """SpatialGrid(64, enemies) makes a grid of 64-pixel cells holding the given boxes"""
+        if cell_size <= 0: raise Exception("cell_size must be positive")
+        self.cell_size = cell_size
+        self._cells = {}
+        self._boxes = []
+        for box in boxes:
+            self.add(box)
+
+    def _cell_range(self, box, padding=0, padding2=None):
+        if padding2 is None: padding2 = padding
+        size = self.cell_size
+        x, y, hw, hh = box.x, box.y, box._w / 2 + padding, box._h / 2 + padding2
+        return int((x - hw) // size), int((x + hw) // size), int((y - hh) // size), int((y + hh) // size)
+
+    def add(self, box):
+        """puts box into every cell it overlaps"""
+        index = len(self._boxes)
+        self._boxes.append(box)
+        cells = self._cells
+        x0, x1, y0, y1 = self._cell_range(box)
+        if x0 == x1 and y0 == y1:
+            # most boxes are smaller than a cell, so skip the loops when only one cell is covered
+            cell = cells.get((x0, y0))
+            if cell is None:
+                cells[(x0, y0)] = [index]
+            else:
+                cell.append(index)
+            return
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell is None:
+                    cells[(cx, cy)] = [index]
+                else:
+                    cell.append(index)
+
+    def clear(self):
+        """removes every box from the grid"""
+        self._cells.clear()
+        self._boxes = []
+
+    def rebuild(self, boxes):
+        """empties the grid and fills it with the given boxes (call after the boxes have moved)"""
+        self.clear()
+        add = self.add
+        for box in boxes:
+            add(box)
+
+    def nearby(self, box, padding=0, padding2=None):
+        """returns the boxes sharing a cell with box (after padding), in the order they were added.
+        Every box that touches box is included, but some that do not touch it may be too."""
+        cells = self._cells
+        found = set()
+        x0, x1, y0, y1 = self._cell_range(box, padding, padding2)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell is not None:
+                    found.update(cell)
+        boxes = self._boxes
+        return [boxes[i] for i in sorted(found)]
+
+    def touching(self, box, padding=0, padding2=None):
+        """returns the boxes in the grid that box.touches(...), in the order they were added"""
+        return [other for other in self.nearby(box, padding, padding2) if box.touches(other, padding, padding2)]
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def __iter__(self):
+        return iter(self._boxes)
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return 'SpatialGrid of %d boxes in %d cells of size %d' % (len(self._boxes), len(self._cells), self.cell_size)
+
+
+__all__.append('SpatialGrid')
+
+
+class EntityPool(object):
+    """Stores many simple color boxes (bullets, enemies, ...) as numpy columns instead of one SpriteBox each, so
+    moving, culling, and collision tests run on all of them at once. Every entity has x, y, w, h, speedx, and speedy
+    columns plus any extra numeric fields named when the pool is made.
+    It is meant for games with thousands of plain color boxes, like a bullet-hell pattern, where a list of SpriteBoxes
+    gets slow (bench_entity_pool in benchmarks.py shows the difference); at the few dozen bullets Super Space Shoot
+    has on screen, its SpriteBox lists and color_box_pool are just as fast, so game.py doesn't use it.
+    Each entity is seen through a PoolSprite, which can stand in for a color SpriteBox (position, edges, size,
+    speed, color, touches, move_speed, draw) but has no image and can't be rotated, flipped, or scaled.
+    Requires numpy."""
+
+    base_fields = ('x', 'y', 'w', 'h', 'speedx', 'speedy')
+
+    def __init__(self, fields=(), capacity=64):
+        """EntityPool(['hp', 'pierce']) makes a pool whose entities also have hp and pierce numbers"""
+        if _np is None: raise Exception("EntityPool needs numpy; try pip install numpy")
+        self.fields = self.base_fields + tuple(name for name in fields if name not in self.base_fields)
+        self.count = 0
+        self._capacity = max(1, int(capacity))
+        self._columns = dict((name, _np.zeros(self._capacity)) for name in self.fields)
+        self._colors = []
+        self._views = []
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """loops over SpriteBox-like views of every entity; removing entities while looping is not allowed"""
+        return iter([self.view(i) for i in range(self.count)])
+
+    def _grow(self):
+        self._capacity *= 2
+        for name, column in self._columns.items():
+            bigger = _np.zeros(self._capacity)
+            bigger[:self.count] = column[:self.count]
+            self._columns[name] = bigger
+
+    def add(self, x, y, w, h, color, speedx=0, speedy=0, **fields):
+        """adds an entity and returns its index; pool.add(10, 20, 5, 5, "white", speedy=-10, pierce=1)"""
+        if self.count == self._capacity: self._grow()
+        i = self.count
+        columns = self._columns
+        for name in self.fields:
+            columns[name][i] = 0
+        columns['x'][i], columns['y'][i], columns['w'][i], columns['h'][i] = x, y, w, h
+        columns['speedx'][i], columns['speedy'][i] = speedx, speedy
+        for name, value in fields.items():
+            if name not in columns: raise Exception("There is no '" + name + "' field in this EntityPool")
+            columns[name][i] = value
+        self._colors.append(get_color(color))
+        self._views.append(None)
+        self.count += 1
+        return i
+
+    def spawn(self, x, y, w, h, color, speedx=0, speedy=0, **fields):
+        """the same as add, but returns a SpriteBox-like view of the new entity"""
+        return self.view(self.add(x, y, w, h, color, speedx, speedy, **fields))
+
+    def column(self, name):
+        """returns the numpy array of the named field for the live entities; changing it changes the entities"""
+        return self._columns[name][:self.count]
+
+    def view(self, index):
+        """returns the PoolSprite for the entity at index; the same view object stays attached to that entity
+        even when removals change its index"""
+        view = self._views[index]
+        if view is None:
+            view = PoolSprite(self, index)
+            self._views[index] = view
+        return view
+
+    def remove(self, index):
+        """removes one entity in constant time by moving the last entity into its place (so order changes)"""
+        last = self.count - 1
+        if index < 0 or index > last: raise IndexError(index)
+        dead = self._views[index]
+        if dead is not None: dead._index = -1
+        if index != last:
+            for column in self._columns.values():
+                column[index] = column[last]
+            self._colors[index] = self._colors[last]
+            moved = self._views[last]
+            if moved is not None: moved._index = index
+            self._views[index] = moved
+        self._colors.pop()
+        self._views.pop()
+        self.count = last
+
+    def remove_where(self, mask):
+        """removes every entity whose entry in the boolean array mask is True, keeping the others in order;
+        returns how many were removed"""
+        keep = ~_np.asarray(mask, dtype=bool)
+        kept = int(keep.sum())
+        removed = self.count - kept
+        if removed == 0: return 0
+        for name, column in self._columns.items():
+            column[:kept] = column[:self.count][keep]
+        colors, views = [], []
+        for color, view, stays in zip(self._colors, self._views, keep.tolist()):
+            if stays:
+                if view is not None: view._index = len(views)
+                colors.append(color)
+                views.append(view)
+            elif view is not None:
+                view._index = -1
+        self._colors, self._views = colors, views
+        self.count = kept
+        return removed
+
+    def clear(self):
+        """removes every entity"""
+        self.remove_where(_np.ones(self.count, dtype=bool))
+
+    def move_speed_all(self):
+        """changes every entity's position by its speed"""
+        n = self.count
+        columns = self._columns
+        columns['x'][:n] += columns['speedx'][:n]
+        columns['y'][:n] += columns['speedy'][:n]
+
+    def inside_mask(self, left, top, right, bottom):
+        """returns a boolean array, True for each entity with any part inside the given bounds"""
+        n = self.count
+        x, y = self._columns['x'][:n], self._columns['y'][:n]
+        hw, hh = self._columns['w'][:n] / 2, self._columns['h'][:n] / 2
+        return (x + hw >= left) & (x - hw <= right) & (y + hh >= top) & (y - hh <= bottom)
+
+    def outside_mask(self, left, top, right, bottom):
+        """returns a boolean array, True for each entity with any part outside the given bounds"""
+        n = self.count
+        x, y = self._columns['x'][:n], self._columns['y'][:n]
+        hw, hh = self._columns['w'][:n] / 2, self._columns['h'][:n] / 2
+        return (x - hw < left) | (x + hw > right) | (y - hh < top) | (y + hh > bottom)
+
+    def overlaps(self, other=None, padding=0, padding2=None):
+        """returns an n-by-2 numpy array of index pairs (i in this pool, j in other) whose boxes touch, using the
+        same rule as SpriteBox.touches; other may be another EntityPool or a list of SpriteBoxes.
+        With no other, pairs within this pool are returned once each, with i < j."""
+        if padding2 is None: padding2 = padding
+        same = other is None or other is self
+        if same:
+            other = self
+        if isinstance(other, EntityPool):
+            ox, oy = other.column('x'), other.column('y')
+            ow, oh = other.column('w'), other.column('h')
+        else:
+            ox = _np.array([box.x for box in other], dtype=float)
+            oy = _np.array([box.y for box in other], dtype=float)
+            ow = _np.array([box.width for box in other], dtype=float)
+            oh = _np.array([box.height for box in other], dtype=float)
+        if self.count == 0 or len(ox) == 0: return _np.zeros((0, 2), dtype=int)
+        x, y, w, h = self.column('x'), self.column('y'), self.column('w'), self.column('h')
+        # sort the other boxes by y so each of our boxes only looks at the run of them within reach vertically,
+        # instead of comparing every pair
+        order = _np.argsort(oy, kind='stable')
+        sorted_y = oy[order]
+        reach = (h + oh.max()) / 2 + padding2
+        lo = _np.searchsorted(sorted_y, y - reach, 'left')
+        counts = _np.searchsorted(sorted_y, y + reach, 'right') - lo
+        i = _np.repeat(_np.arange(self.count), counts)
+        starts = _np.repeat(_np.cumsum(counts) - counts - lo, counts)
+        j = order[_np.arange(len(i)) - starts]
+        hit = ((_np.abs(x[i] - ox[j]) * 2 <= w[i] + ow[j] + 2 * padding) &
+               (_np.abs(y[i] - oy[j]) * 2 <= h[i] + oh[j] + 2 * padding2))
+        if same:
+            hit &= i < j
+        i, j = i[hit], j[hit]
+        first = _np.lexsort((j, i))
+        return _np.stack([i[first], j[first]], axis=1)
+
+    def draw(self, camera):
+        """draws every entity that is at least partly inside the camera"""
+        surface = camera._surface
+        cx, cy = camera._x, camera._y
+        visible = _np.nonzero(self.inside_mask(cx, cy, cx + surface.get_width(), cy + surface.get_height()))[0]
+        left = (self.column('x') - self.column('w') / 2 - cx)[visible].tolist()
+        top = (self.column('y') - self.column('h') / 2 - cy)[visible].tolist()
+        w, h = self.column('w')[visible].tolist(), self.column('h')[visible].tolist()
+        colors = self._colors
+        dirty = camera._dirty
+        screen = surface.get_rect()
+        for k, i in enumerate(visible.tolist()):
+            # clipped first, since fill moves a rect hanging off the top or left onto the screen
+            region = surface.fill(colors[i], screen.clip((left[k], top[k], w[k], h[k])))
+            if dirty is not None: dirty.append(region)
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return 'EntityPool of %d entities with fields %s' % (self.count, ', '.join(self.fields))
+
+
+__all__.append('EntityPool')
+
+
+class PoolSprite(object):
+    """A SpriteBox-like view of one entity in an EntityPool: it has x, y, speedx, left, center, touches, move_speed,
+    and so on, plus the pool's extra fields, all read from and written to the pool's columns.
+    After its entity is removed, alive is False and using it is an error."""
+
+    __slots__ = ['_pool', '_index']
+
+    def __init__(self, pool, index):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_index', index)
+
+    def _get(self, name):
+        if self._index < 0: raise Exception("This entity has been removed from its EntityPool")
+        return float(self._pool._columns[name][self._index])
+
+    def _put(self, name, value):
+        if self._index < 0: raise Exception("This entity has been removed from its EntityPool")
+        self._pool._columns[name][self._index] = value
+
+    def __getattr__(self, name):
+        # only reached for names that are not properties: the pool's extra fields
+        if name in self._pool._columns: return self._get(name)
+        raise AttributeError("There is no '" + name + "' in a PoolSprite object")
+
+    def __setattr__(self, name, value):
+        if name in PoolSprite.__dict__ or name in ('_pool', '_index'):
+            object.__setattr__(self, name, value)
+        elif name in self._pool._columns:
+            self._put(name, value)
+        else:
+            raise AttributeError("There is no '" + name + "' field in this PoolSprite's EntityPool")
+
+    @property
+    def alive(self):
+        return self._index >= 0
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def pool(self):
+        return self._pool
+
+    x = property(lambda self: self._get('x'), lambda self, value: self._put('x', value))
+    y = property(lambda self: self._get('y'), lambda self, value: self._put('y', value))
+    speedx = property(lambda self: self._get('speedx'), lambda self, value: self._put('speedx', value))
+    speedy = property(lambda self: self._get('speedy'), lambda self, value: self._put('speedy', value))
+    _w = property(lambda self: self._get('w'))
+    _h = property(lambda self: self._get('h'))
+    width = property(lambda self: self._get('w'), lambda self, value: self._put('w', value))
+    height = property(lambda self: self._get('h'), lambda self, value: self._put('h', value))
+
+    @property
+    def left(self):
+        return self.x - self.width / 2
+
+    @left.setter
+    def left(self, value):
+        self.x = value + self.width / 2
+
+    @property
+    def right(self):
+        return self.x + self.width / 2
+
+    @right.setter
+    def right(self, value):
+        self.x = value - self.width / 2
+
+    @property
+    def top(self):
+        return self.y - self.height / 2
+
+    @top.setter
+    def top(self, value):
+        self.y = value + self.height / 2
+
+    @property
+    def bottom(self):
+        return self.y + self.height / 2
+
+    @bottom.setter
+    def bottom(self, value):
+        self.y = value - self.height / 2
+
+    @property
+    def center(self):
+        return self.x, self.y
+
+    @center.setter
+    def center(self, value):
+        self.x, self.y = value[0], value[1]
+
+    @property
+    def topleft(self):
+        return self.left, self.top
+
+    @topleft.setter
+    def topleft(self, value):
+        self.left, self.top = value[0], value[1]
+
+    @property
+    def topright(self):
+        return self.right, self.top
+
+    @topright.setter
+    def topright(self, value):
+        self.right, self.top = value[0], value[1]
+
+    @property
+    def bottomleft(self):
+        return self.left, self.bottom
+
+    @bottomleft.setter
+    def bottomleft(self, value):
+        self.left, self.bottom = value[0], value[1]
+
+    @property
+    def bottomright(self):
+        return self.right, self.bottom
+
+    @bottomright.setter
+    def bottomright(self, value):
+        self.right, self.bottom = value[0], value[1]
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    @size.setter
+    def size(self, value):
+        self.width, self.height = value[0], value[1]
+
+    @property
+    def speed(self):
+        return self.speedx, self.speedy
+
+    @speed.setter
+    def speed(self, value):
+        self.speedx, self.speedy = value[0], value[1]
+
+    @property
+    def rect(self):
+        return pygame.Rect(self.left, self.top, self.width, self.height)
+
+    @property
+    def color(self):
+        return pygame.Color(self._pool._colors[self._index])
+
+    @color.setter
+    def color(self, value):
+        self._pool._colors[self._index] = get_color(value)
+
+    touches = SpriteBox.touches
+    overlap = SpriteBox.overlap
+    contains = SpriteBox.contains
+
+    def move(self, x, y=None):
+        """change position by the given amount in x and y. If only x given, assumed to be a point [x,y]"""
+        if y is None: x, y = x
+        self.x += x
+        self.y += y
+
+    def move_speed(self):
+        """change position by the current speed field"""
+        self.move(self.speedx, self.speedy)
+
+    def remove(self):
+        """removes this entity from its pool"""
+        self._pool.remove(self._index)
+
+    def draw(self, surface):
+        """p.draw(camera) is the same as saying camera.draw(p)"""
+        if isinstance(surface, Camera):
+            region = self.rect.move(-surface._x, -surface._y).clip(surface._surface.get_rect())
+            region = surface._surface.fill(self._pool._colors[self._index], region)
+            if surface._dirty is not None: surface._dirty.append(region)
+        else:
+            surface.fill(self._pool._colors[self._index], self.rect)
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        if self._index < 0: return 'removed PoolSprite'
+        return '%dx%d PoolSprite centered at %d,%d' % (self.width, self.height, self.x, self.y)
+
+
+__all__.append('PoolSprite')
+
+
+class SpawnTimeline(object):
+    """A level's enemies, pickups, and so on, made only when the camera scrolls near them rather than all at once,
+    so a long level costs no more per frame than what is on screen. Each event is a function to call and the y
+    position at which it comes into play, the edge the camera reaches first: for a level that scrolls up, the
+    bottom of what it makes; for one that scrolls down, the top.
+    ----
+    timeline = gamebox.SpawnTimeline(margin=60)
+    timeline.add(-1400 + 15, make_enemy, 100, -1400)
+    ...
+    timeline.update(camera)  # once per tick: calls make_enemy(100, -1400) once the camera's top is near -1385
+    ----"""
+
+    def __init__(self, margin=100, scroll='up'):
+        """margin: how many pixels beyond the edge of the camera to spawn things;
+        scroll: 'up' if the camera moves toward smaller y, 'down' if toward larger y"""
+        self.margin = margin
+        self.scroll = scroll
+        self._events = []
+        self._next = 0
+        self._sorted = True
+        self._order = 0
+
+    def add(self, y, spawn, *args, **kwargs):
+        """schedules spawn(*args, **kwargs) for when the camera reaches y"""
+        self._events.append((-y if self.scroll == 'up' else y, self._order, spawn, args, kwargs))
+        self._order += 1
+        self._sorted = False
+
+    def _sort(self):
+        self._events = sorted(self._events[self._next:])
+        self._next = 0
+        self._sorted = True
+
+    def update(self, camera):
+        """makes everything the camera has come within margin of, in order; returns how many things were made"""
+        if not self._sorted: self._sort()
+        if self.scroll == 'up':
+            limit = -(camera.top - self.margin)
+        else:
+            limit = camera.bottom + self.margin
+        return self.spawn_until(limit)
+
+    def spawn_until(self, limit):
+        """makes every event keyed at or before limit (in the timeline's own order: -y for 'up', y for 'down')"""
+        if not self._sorted: self._sort()
+        events = self._events
+        start = self._next
+        while self._next < len(events) and events[self._next][0] <= limit:
+            key, order, spawn, args, kwargs = events[self._next]
+            self._next += 1
+            spawn(*args, **kwargs)
+        return self._next - start
+
+    def pending(self, *spawns):
+        """how many events have not been made yet; given functions, only counts the events that call one of them"""
+        events = self._events[self._next:]
+        if not spawns: return len(events)
+        return sum(1 for event in events if event[2] in spawns)
+
+    def __len__(self):
+        return len(self._events) - self._next
+
+    def clear(self):
+        """forgets every event"""
+        self._events = []
+        self._next = 0
+        self._sorted = True
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return 'SpawnTimeline with %d events to go' % len(self)
+
+
+__all__.append('SpawnTimeline')
+
+_known_levels = {}
+_level_compiler_version = 1
+# part of every compiled level's cache key; change it whenever compile_level would compile a file differently, so
+# levels compiled by an older version are compiled again instead of being read back from the disk cache
+
+_level_operators = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.USub: operator.neg, ast.UAdd: operator.pos
+}
+_level_functions = {'int': int, 'abs': abs, 'min': min, 'max': max, 'round': round}
+_level_expressions = {}
+
+
+def _level_value(value, names):
+    """a number from a level file: numbers are used as they are, strings are worked out as arithmetic"""
+    if not isinstance(value, type(u'')) and not isinstance(value, str): return value
+    try:
+        node = _level_expressions.get(value)
+        if node is None:
+            node = _level_expressions[value] = ast.parse(value.strip(), mode='eval').body
+        return _level_eval(node, names)
+    except (SyntaxError, KeyError, TypeError, ZeroDivisionError) as error:
+        raise Exception("Can't work out '" + value + "' in a level file: " + repr(error))
+
+
+def _level_eval(node, names):
+    if isinstance(node, ast.BinOp) and type(node.op) in _level_operators:
+        return _level_operators[type(node.op)](_level_eval(node.left, names), _level_eval(node.right, names))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _level_operators:
+        return _level_operators[type(node.op)](_level_eval(node.operand, names))
+    if isinstance(node, ast.Name):
+        return names[node.id]
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _level_functions:
+        return _level_functions[node.func.id](*[_level_eval(arg, names) for arg in node.args])
+    value = getattr(node, 'value', getattr(node, 'n', None))
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    raise TypeError("only numbers, names, + - * / // %, and " + ", ".join(sorted(_level_functions)) + " are allowed")
+
+
+def _expand_level(entries, names, table):
+    """adds [make, {argument: value}] to table for each spawn in entries, unrolling repeats"""
+    for entry in entries:
+        if 'repeat' in entry:
+            _repeat_level(list(entry['repeat'].items()), entry.get('spawns', []), names, table)
+        elif 'make' in entry:
+            table.append([entry['make'], OrderedDict((key, _level_value(value, names)) for key, value in entry.items()
+                                                     if key not in ('make', 'note'))])
+        elif 'note' not in entry:
+            raise Exception("A level file entry needs a 'make' or a 'repeat': " + json.dumps(entry))
+
+
+def _repeat_level(loops, spawns, names, table):
+    if not loops:
+        _expand_level(spawns, names, table)
+        return
+    name, bounds = loops[0]
+    for value in range(*[int(_level_value(bound, names)) for bound in bounds]):
+        inner = dict(names)
+        inner[name] = value
+        _repeat_level(loops[1:], spawns, inner, table)
+
+
+def compile_level(text, constants=None):
+    """Turns the JSON text of a level file into a list of [make, {argument: value}] spawns; see load_level"""
+    level = json.loads(text, object_pairs_hook=OrderedDict)
+    if level.get('format', 1) > 1: raise Exception("This level file needs a newer gamebox")
+    table = []
+    _expand_level(level.get('spawns', []), dict(constants or {}), table)
+    return table
+
+
+__all__.append('compile_level')
+
+
+def load_level(filename, constants=None, cache_dir=None):
+    """Reads a level file: a JSON description of what a level spawns, turned into a list of [make, arguments]
+    where make is a name the game chooses (like "basic" or "mover") and arguments is a dict of numbers.
+    ----
+    {"format": 1, "spawns": [
+        {"make": "basic", "x": 100, "y": 100, "note": "one enemy"},
+        {"repeat": {"i": [15, "width", 30], "j": [-100, -400, -30]}, "spawns": [
+            {"make": "basic", "x": "i", "y": "j", "hp": 2}
+        ], "note": "a grid of them, i and j counting like range(...)"},
+        {"repeat": {"i": [0, 120, 30]}, "spawns": [
+            {"make": "mover", "x": 200, "y": -1200, "x_phase": "i", "y_phase": "i + 30"}
+        ], "note": "a ring of movers a quarter period apart"}
+    ]}
+    ----
+    Strings are arithmetic on the repeat counters and the given constants (e.g. {"width": 400}).
+    The compiled list is kept in memory and saved in a .level_cache folder next to the file (or in cache_dir),
+    both keyed by a hash of the file, the constants, and the compiler's version, so loading a level again skips
+    compiling it."""
+    with open(filename, 'rb') as f:
+        data = f.read()
+    constants = constants or {}
+    key = repr((_level_compiler_version, sorted(constants.items())))
+    digest = hashlib.sha1(data + key.encode()).hexdigest()
+    table = _known_levels.get(digest)
+    if table is not None: return table
+    if cache_dir is None: cache_dir = os.path.join(os.path.dirname(os.path.abspath(filename)), '.level_cache')
+    cache_file = os.path.join(cache_dir, digest + '.json')
+    try:
+        with open(cache_file) as f:
+            table = json.load(f)
+    except (IOError, OSError, ValueError):
+        table = compile_level(data.decode('utf-8'), constants)
+        try:
+            if not os.path.isdir(cache_dir): os.makedirs(cache_dir)
+            with open(cache_file + '.tmp', 'w') as f:
+                json.dump(table, f)
+            os.rename(cache_file + '.tmp', cache_file)
+        except (IOError, OSError):
+            pass  # a read-only folder just means compiling again next time
+    _known_levels[digest] = table
+    return table
+
+
+__all__.append('load_level')
+
+_wave_tables = {}
+_spline_tables = {}
+
+
+def _wave_table(period):
+    """the sine and cosine of each tick of a wave period ticks long, shared by every path with that period"""
+    table = _wave_tables.get(period)
+    if table is None:
+        turn = 2 * math.pi / period
+        table = _wave_tables[period] = ([math.sin(turn * t) for t in range(period)],
+                                        [math.cos(turn * t) for t in range(period)])
+    return table
+
+
+def _spline_table(points, period, loop):
+    """the position on a Catmull-Rom spline through points at each of period ticks"""
+    key = (points, period, loop)
+    table = _spline_tables.get(key)
+    if table is None:
+        count = len(points)
+        segments = count if loop else count - 1
+        xs, ys = [], []
+        for t in range(period):
+            u = segments * t / (period if loop or period == 1 else period - 1)
+            i = min(int(u), segments - 1) if segments else 0
+            f = u - i
+            if loop:
+                p0, p1, p2, p3 = (points[(i + k) % count] for k in (-1, 0, 1, 2))
+            else:
+                p0, p1, p2, p3 = (points[max(0, min(count - 1, i + k))] for k in (-1, 0, 1, 2))
+            f2, f3 = f * f, f * f * f
+            for axis, out in ((0, xs), (1, ys)):
+                out.append(0.5 * (2 * p1[axis] + (p2[axis] - p0[axis]) * f +
+                                  (2 * p0[axis] - 5 * p1[axis] + 4 * p2[axis] - p3[axis]) * f2 +
+                                  (3 * p1[axis] - p0[axis] - 3 * p2[axis] + p3[axis]) * f3))
+        table = _spline_tables[key] = (xs, ys)
+    return table
+
+
+class Path(object):
+    """Where something is t ticks after it starts moving: a starting point, plus a steady speed, plus a sine wave
+    on each axis, plus a spline. Made by linear_path, sine_path, lissajous_path, and spline_path, and followed by
+    the boxes in a MotionGroup. Periods are whole numbers of ticks; phases are in radians."""
+
+    def __init__(self, x=0, y=0, speedx=0, speedy=0, x_amplitude=0, y_amplitude=0, x_period=1, y_period=1,
+                 x_phase=0, y_phase=0, spline=(), spline_period=1, loop=True):
+        self.x, self.y = x, y
+        self.speedx, self.speedy = speedx, speedy
+        self.x_amplitude, self.y_amplitude = x_amplitude, y_amplitude
+        self.x_period, self.y_period = max(1, int(x_period)), max(1, int(y_period))
+        self.x_phase, self.y_phase = x_phase, y_phase
+        self.spline = tuple((float(px), float(py)) for px, py in spline) or ((0.0, 0.0),)
+        self.spline_period = max(1, int(spline_period))
+        self.loop = loop
+
+    def position(self, t):
+        """the (x, y) position t ticks along the path"""
+        sx, cx = _wave_table(self.x_period)
+        sy, cy = _wave_table(self.y_period)
+        tx, ty = t % self.x_period, t % self.y_period
+        px, py = _spline_table(self.spline, self.spline_period, self.loop)
+        ts = t % self.spline_period if self.loop else min(t, self.spline_period - 1)
+        return (self.x + self.speedx * t +
+                self.x_amplitude * (sx[tx] * math.cos(self.x_phase) - cx[tx] * math.sin(self.x_phase)) + px[ts],
+                self.y + self.speedy * t +
+                self.y_amplitude * (sy[ty] * math.cos(self.y_phase) - cy[ty] * math.sin(self.y_phase)) + py[ts])
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return 'Path from (%g, %g)' % (self.x, self.y)
+
+
+__all__.append('Path')
+
+
+def linear_path(x, y, speedx, speedy):
+    """A path starting at (x, y) and moving speedx and speedy pixels each tick"""
+    return Path(x, y, speedx, speedy)
+
+
+__all__.append('linear_path')
+
+
+def sine_path(x, y, amplitude, period, phase=0, vertical=False, speedx=0, speedy=0):
+    """A path swinging amplitude pixels either side of (x, y), side to side (or up and down if vertical),
+    once every period ticks, while drifting speedx and speedy pixels each tick"""
+    if vertical: return Path(x, y, speedx, speedy, y_amplitude=amplitude, y_period=period, y_phase=phase)
+    return Path(x, y, speedx, speedy, x_amplitude=amplitude, x_period=period, x_phase=phase)
+
+
+__all__.append('sine_path')
+
+
+def lissajous_path(x, y, x_amplitude, y_amplitude, x_period, y_period, x_phase=0, y_phase=0):
+    """A path around (x, y) with a separate sine wave on each axis: equal periods and phases a quarter turn apart
+    make circles and ellipses, other periods make figure eights and knots"""
+    return Path(x, y, 0, 0, x_amplitude, y_amplitude, x_period, y_period, x_phase, y_phase)
+
+
+__all__.append('lissajous_path')
+
+
+def spline_path(points, period, loop=True):
+    """A smooth (Catmull-Rom) path through a list of (x, y) points, taking period ticks to go through all of
+    them; with loop it goes back around to the first point, otherwise it stops at the last"""
+    return Path(spline=points, spline_period=period, loop=loop)
+
+
+__all__.append('spline_path')
+
+
+class MotionGroup(object):
+    """Moves many SpriteBoxes along Paths at once. Each call to step() puts every box where its path says it is
+    this tick, working all of the positions out together (with numpy when it is installed and the group is big).
+    Boxes that are killed are dropped from the group on the next step.
+    ----
+    movers = gamebox.MotionGroup()
+    movers.add(enemy, gamebox.lissajous_path(200, 100, 60, 60, 120, 120, 0, math.pi / 2))
+    ...
+    movers.step()  # once per tick
+    ----"""
+
+    numpy_threshold = 16
+
+    def __init__(self):
+        self.tick = 0
+        self._boxes = []
+        self._paths = []
+        self._starts = []
+        self._arrays = None
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def add(self, box, path, tick=0):
+        """adds box to the group, tick ticks along path (so several boxes can share a path at different points),
+        and returns box"""
+        self._boxes.append(box)
+        self._paths.append(path)
+        self._starts.append(self.tick - tick)
+        self._arrays = None
+        return box
+
+    def clear(self):
+        """removes every box from the group"""
+        self.tick = 0
+        self._boxes = []
+        self._paths = []
+        self._starts = []
+        self._arrays = None
+
+    def remove_dead(self):
+        """drops every box that has been killed, keeping the rest in order"""
+        keep = [i for i, box in enumerate(self._boxes) if not box.dead]
+        if len(keep) == len(self._boxes): return
+        self._boxes = [self._boxes[i] for i in keep]
+        self._paths = [self._paths[i] for i in keep]
+        self._starts = [self._starts[i] for i in keep]
+        if self._arrays is not None:
+            index = _np.array(keep, dtype=int)
+            self._arrays = dict((name, column[index]) if name not in ('xtable', 'ytable') else (name, column)
+                                for name, column in self._arrays.items())
+
+    def _build(self):
+        """lays the paths out as numpy columns, with every wave and spline table they use joined end to end"""
+        xtable, ytable, offsets = [], [], {}
+
+        def offset(key, table):
+            if key not in offsets:
+                offsets[key] = len(xtable)
+                xtable.extend(table[0])
+                ytable.extend(table[1])
+            return offsets[key]
+
+        columns = dict((name, []) for name in ('x', 'y', 'speedx', 'speedy', 'xa', 'ya', 'xc', 'xs', 'yc', 'ys',
+                                                'xperiod', 'yperiod', 'xwave', 'ywave', 'speriod', 'spline', 'loop'))
+        for path in self._paths:
+            for name, value in (('x', path.x), ('y', path.y), ('speedx', path.speedx), ('speedy', path.speedy),
+                                ('xa', path.x_amplitude), ('ya', path.y_amplitude),
+                                ('xc', math.cos(path.x_phase)), ('xs', math.sin(path.x_phase)),
+                                ('yc', math.cos(path.y_phase)), ('ys', math.sin(path.y_phase)),
+                                ('xperiod', path.x_period), ('yperiod', path.y_period),
+                                ('speriod', path.spline_period), ('loop', path.loop)):
+                columns[name].append(value)
+            # a wave table is stored as its sines in xtable and its cosines in ytable
+            columns['xwave'].append(offset(('wave', path.x_period), _wave_table(path.x_period)))
+            columns['ywave'].append(offset(('wave', path.y_period), _wave_table(path.y_period)))
+            key = ('spline', path.spline, path.spline_period, path.loop)
+            columns['spline'].append(offset(key, _spline_table(path.spline, path.spline_period, path.loop)))
+        arrays = {}
+        for name, values in columns.items():
+            kind = int if name in ('xperiod', 'yperiod', 'xwave', 'ywave', 'speriod', 'spline') else float
+            arrays[name] = _np.array(values, dtype=bool if name == 'loop' else kind)
+        arrays['start'] = _np.array(self._starts, dtype=int)
+        arrays['xtable'] = _np.array(xtable)
+        arrays['ytable'] = _np.array(ytable)
+        self._arrays = arrays
+
+    def positions(self):
+        """returns lists of the x and y positions every box's path gives for the current tick"""
+        if _np is None or len(self._boxes) < self.numpy_threshold:
+            xs, ys = [], []
+            for path, start in zip(self._paths, self._starts):
+                x, y = path.position(self.tick - start)
+                xs.append(x)
+                ys.append(y)
+            return xs, ys
+        if self._arrays is None or len(self._arrays['start']) != len(self._boxes): self._build()
+        a = self._arrays
+        sines, cosines = a['xtable'], a['ytable']
+        t = self.tick - a['start']
+        tx = a['xwave'] + t % a['xperiod']
+        ty = a['ywave'] + t % a['yperiod']
+        ts = a['spline'] + _np.where(a['loop'], t % a['speriod'], _np.minimum(t, a['speriod'] - 1))
+        xs = a['x'] + a['speedx'] * t + a['xa'] * (sines[tx] * a['xc'] - cosines[tx] * a['xs']) + sines[ts]
+        ys = a['y'] + a['speedy'] * t + a['ya'] * (sines[ty] * a['yc'] - cosines[ty] * a['ys']) + cosines[ts]
+        return xs.tolist(), ys.tolist()
+
+    def step(self):
+        """drops killed boxes, moves every other box to where its path is this tick, and advances one tick"""
+        self.remove_dead()
+        xs, ys = self.positions()
+        for box, x, y in zip(self._boxes, xs, ys):
+            box.x = x
+            box.y = y
+        self.tick += 1
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return 'MotionGroup of %d boxes at tick %d' % (len(self._boxes), self.tick)
+
+
+__all__.append('MotionGroup')
+
 _timeron = False
 _timerfps = 0
 
@@ -658,16 +2720,368 @@ def timer_loop(fps, callback, limit=None):
         if event.type == pygame.USEREVENT:
             frames += 1
             pygame.event.clear(pygame.USEREVENT)
-            callback(keys)
+            with _profiler.scope('tick'):
+                callback(keys)
+            _profiler.end_frame()
     pygame.time.set_timer(pygame.USEREVENT, 0)
     _timeron = False
+    if not limit or frames < limit: _run_quit_callbacks()
     return limit == frames
 
 
+_paused = False
+# True while fixed_step_loop is running, which keeps time itself rather than with the USEREVENT timer
+_fixed_stepping = False
+_loop_stats = {'updates': 0, 'renders': 0, 'dropped': 0}
+
+
+def fixed_step_loop(fps, update, render=None, render_fps=None, max_steps=5, limit=None):
+    """Runs a game with the simulation and the drawing separated, so the game keeps its speed when drawing is slow
+    fps: how many times a second to call update (the simulation rate)
+    update: a function that accepts the set of keys held down and dt, the seconds per update (always 1 / fps)
+    render: a function that accepts alpha, how far (0 to 1) real time is between the last update and the next one
+    render_fps: how many times a second to call render (defaults to fps); it may be more or less than fps
+    max_steps: the most updates run to catch up before rendering again; time beyond that is dropped
+    limit: if given, will only run for that many updates and then return
+    returns: a dict with how many updates and renders ran and how many updates were dropped to stay responsive
+    ----
+    def update(keys, dt):
+        box.speedx = 5 if pygame.K_RIGHT in keys else 0
+        box.move_speed()
+
+    def render(alpha):
+        camera.clear("black")
+        camera.draw(box)
+        camera.display()
+
+    gamebox.fixed_step_loop(30, update, render)
+    ----"""
+    global _timeron, _timerfps, _paused, _fixed_stepping
+    keys = set([])
+    dt = 1 / fps
+    _timerfps = fps
+    _timeron = True
+    _fixed_stepping = True
+    _paused = False
+    stats = {'updates': 0, 'renders': 0, 'dropped': 0}
+    _loop_stats.update(stats)
+    clock = pygame.time.Clock()
+    accumulator = 0
+    previous = time.perf_counter()
+    running = True
+    while running and (not limit or stats['updates'] < limit):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT: running = False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE: running = False
+            if event.type == pygame.KEYDOWN:
+                keys.add(event.key)
+            if event.type == pygame.KEYUP and event.key in keys:
+                keys.remove(event.key)
+        if not running: break
+        now = time.perf_counter()
+        if not _paused:
+            accumulator += now - previous
+        previous = now
+        steps = 0
+        while accumulator >= dt and steps < max_steps and not (limit and stats['updates'] >= limit):
+            with _profiler.scope('update'):
+                update(keys, dt)
+            accumulator -= dt
+            steps += 1
+            stats['updates'] += 1
+        if accumulator >= dt and steps == max_steps:
+            # too far behind to catch up: drop the missing updates rather than stall in a spiral of catching up
+            dropped = int(accumulator // dt)
+            stats['dropped'] += dropped
+            accumulator -= dropped * dt
+        if render is not None:
+            with _profiler.scope('render'):
+                render(accumulator / dt)
+            stats['renders'] += 1
+        _profiler.end_frame()
+        _loop_stats.update(stats)
+        clock.tick(render_fps or fps)
+    _timeron = False
+    _fixed_stepping = False
+    if not running: _run_quit_callbacks()
+    return stats
+
+
+__all__.append('fixed_step_loop')
+
+
+def loop_stats():
+    """Returns how many updates and renders the running (or last) fixed_step_loop has done, and how many updates it
+    dropped because the game fell too far behind"""
+    return dict(_loop_stats)
+
+
+__all__.append('loop_stats')
+
+
+class _ProfileScope(object):
+    """what FrameProfiler.scope returns: times the code in a with block"""
+    __slots__ = ['profiler', 'name', 'start']
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        frame = self.profiler._times
+        frame[self.name] = frame.get(self.name, 0) + time.perf_counter() - self.start
+
+
+class _NoScope(object):
+    """what FrameProfiler.scope returns when the profiler is off: does nothing"""
+    __slots__ = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_no_scope = _NoScope()
+
+
+class FrameProfiler(object):
+    """Times the parts of each frame and counts things per frame (sprites, collision checks, blits, ...),
+    keeping the last few hundred frames so it can report the median (p50) and the slow frames (p95, p99).
+    It does nothing until enabled, so the calls can stay in a game's code.
+    ----
+    profiler = gamebox.get_profiler()
+    profiler.enabled = True
+
+    def update(keys, dt):
+        with profiler.scope("collisions"):
+            ...
+        profiler.count("enemies", len(enemies))
+
+    # fixed_step_loop and timer_loop end each frame themselves while the profiler is enabled
+    ...
+    profiler.dump("profile.csv")
+    ----
+    For code that runs in phases one after another, profiler.mark() followed by profiler.lap("phase") at the end
+    of each phase times the phases without wrapping each in a with block."""
+
+    def __init__(self, window=300, enabled=False):
+        """window: how many of the most recent frames the percentiles are taken over"""
+        self.window = window
+        self.enabled = enabled
+        self.frames = 0
+        self.overlay = None
+        self.overlay_every = 15
+        self._overlay_style = (16, 'yellow')
+        self._times = {}
+        self._counts = {}
+        self._history = OrderedDict()
+        self._scopes = {}
+        self._mark = time.perf_counter()
+
+    def scope(self, name):
+        """with profiler.scope(name): ... adds the time taken by the with block to name for this frame"""
+        if not self.enabled: return _no_scope
+        scope = self._scopes.get(name)
+        if scope is None:
+            scope = self._scopes[name] = _ProfileScope(self, name)
+        return scope
+
+    def mark(self):
+        """starts timing the next lap"""
+        self._mark = time.perf_counter()
+
+    def lap(self, name):
+        """adds the time since the last mark or lap to name for this frame"""
+        if not self.enabled: return
+        now = time.perf_counter()
+        self._times[name] = self._times.get(name, 0) + now - self._mark
+        self._mark = now
+
+    def count(self, name, amount=1):
+        """adds amount to the counter called name for this frame"""
+        if not self.enabled: return
+        self._counts[name] = self._counts.get(name, 0) + amount
+
+    def end_frame(self):
+        """files this frame's times and counts; anything measured before but not this frame is recorded as 0"""
+        if not self.enabled: return
+        history = self._history
+        for key in history:
+            samples = history[key]
+            samples.append(self._times.get(key[1], 0) if key[0] == 'time' else self._counts.get(key[1], 0))
+        for kind, values in (('time', self._times), ('count', self._counts)):
+            for name in values:
+                if (kind, name) not in history:
+                    history[(kind, name)] = deque([values[name]], self.window)
+        self._times = {}
+        self._counts = {}
+        self.frames += 1
+        if self.overlay is not None and self.frames % self.overlay_every == 0:
+            self._refresh_overlay()
+
+    def stats(self):
+        """a list of dicts, one per timer or counter: its name, kind ('time' in milliseconds or 'count'),
+        mean, p50, p95, p99 and max over the recent frames"""
+        result = []
+        for (kind, name), samples in self._history.items():
+            scale = 1000 if kind == 'time' else 1
+            ordered = sorted(samples)
+            last = len(ordered) - 1
+            result.append({
+                'name': name, 'kind': kind, 'frames': len(ordered),
+                'mean': scale * sum(ordered) / len(ordered),
+                'p50': scale * ordered[int(last * 0.50)],
+                'p95': scale * ordered[int(last * 0.95)],
+                'p99': scale * ordered[int(last * 0.99)],
+                'max': scale * ordered[last],
+            })
+        return result
+
+    def dump(self, filename):
+        """writes stats() to a .json file, or a .csv file for any other extension"""
+        rows = self.stats()
+        with open(filename, 'w') as f:
+            if filename.endswith('.json'):
+                json.dump(rows, f, indent=1)
+            else:
+                columns = ['name', 'kind', 'frames', 'mean', 'p50', 'p95', 'p99', 'max']
+                f.write(','.join(columns) + '\n')
+                for row in rows:
+                    f.write(','.join(row[c] if c in ('name', 'kind') else '%g' % row[c] for c in columns) + '\n')
+
+    def show_overlay(self, x=0, y=0, anchor='topleft', font_size=16, color='yellow', every=15):
+        """makes profiler.overlay, a Widget listing p50/p95/p99 for every timer and counter; draw it with
+        camera.draw(profiler.overlay). It is updated every few frames so the numbers can be read."""
+        self.overlay = WidgetStack(x, y, anchor=anchor)
+        self.overlay_every = every
+        self._overlay_style = (font_size, color)
+        return self.overlay
+
+    def _refresh_overlay(self):
+        lines = []
+        for row in self.stats():
+            line = '%s %.1f/%.1f/%.1fms' if row['kind'] == 'time' else '%s %d/%d/%d'
+            lines.append(line % (row['name'], row['p50'], row['p95'], row['p99']))
+        labels = self.overlay.widgets
+        while len(labels) < len(lines):
+            labels.append(Label(0, 0, self._overlay_style[0], self._overlay_style[1]))
+        for label, line in zip(labels, lines):
+            label.text = line
+
+    def reset(self):
+        """forgets everything measured so far"""
+        self.frames = 0
+        self._times = {}
+        self._counts = {}
+        self._history = OrderedDict()
+
+
+__all__.append('FrameProfiler')
+
+_profiler = FrameProfiler()
+
+
+def get_profiler():
+    """Returns the FrameProfiler shared by gamebox and games; it is off until profiler.enabled = True"""
+    return _profiler
+
+
+__all__.append('get_profiler')
+
+
+def checksum(values):
+    """Returns a 32-bit number summarizing a list of numbers, strings, and booleans describing a game's state;
+    two runs that end up in the same state give the same checksum"""
+    return zlib.crc32(repr(values).encode()) & 0xffffffff
+
+
+__all__.append('checksum')
+
+
+class InputRecording(object):
+    """The keys held down, mouse button and position, and a checksum of the game's state for every tick of a game,
+    plus the seed for its random numbers. Saved as a compact binary file, it lets the exact same game be played
+    back later (a bug report that can be rerun, or a fixed workload to time)."""
+
+    _magic = b'GBIR'
+    _header = struct.Struct('<4sBqI')
+    _frame = struct.Struct('<BBhhI')
+
+    def __init__(self, seed=None):
+        """InputRecording() picks a seed from the clock; call random.seed(recording.seed) before playing"""
+        if seed is None: seed = int(time.time() * 1000)
+        self.seed = seed
+        self.frames = []
+
+    def record(self, keys, click=False, mouse=(0, 0), state=0):
+        """adds one tick: the keys held down, whether the mouse is clicked, the mouse position, and state, the
+        checksum(...) of the game after that tick"""
+        self.frames.append((tuple(sorted(keys)), bool(click), (int(mouse[0]), int(mouse[1])), state & 0xffffffff))
+
+    def check(self, tick, state):
+        """raises an Exception if state is not the checksum recorded for the given tick"""
+        if self.frames[tick][3] != state & 0xffffffff:
+            raise Exception("Replay went out of sync at tick " + str(tick))
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __iter__(self):
+        """loops over (set of keys, click) for each tick, the way a game's update wants them"""
+        for keys, click, mouse, state in self.frames:
+            yield set(keys), click
+
+    def save(self, filename):
+        """writes the recording to a binary file"""
+        chunks = [self._header.pack(self._magic, 1, self.seed, len(self.frames))]
+        for keys, click, mouse, state in self.frames:
+            chunks.append(self._frame.pack(len(keys), click, mouse[0], mouse[1], state))
+            chunks.append(struct.pack('<%dI' % len(keys), *keys))
+        with open(filename, 'wb') as f:
+            f.write(b''.join(chunks))
+
+    @staticmethod
+    def load(filename):
+        """reads a recording written by save"""
+        with open(filename, 'rb') as f:
+            data = f.read()
+        magic, version, seed, count = InputRecording._header.unpack_from(data, 0)
+        if magic != InputRecording._magic or version != 1:
+            raise Exception(filename + " is not an input recording")
+        recording = InputRecording(seed)
+        offset = InputRecording._header.size
+        frame = InputRecording._frame
+        for _ in range(count):
+            key_count, click, x, y, state = frame.unpack_from(data, offset)
+            offset += frame.size
+            keys = struct.unpack_from('<%dI' % key_count, data, offset)
+            offset += 4 * key_count
+            recording.frames.append((keys, bool(click), (x, y), state))
+        return recording
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return 'InputRecording of %d ticks with seed %d' % (len(self.frames), self.seed)
+
+
+__all__.append('InputRecording')
+
+
 def pause():
     """Pauses the timer; an error if there is no timer to pause"""
+    global _paused
     if not _timeron: raise Exception("Cannot pause a timer before calling timer_loop(fps, callback)")
-    pygame.time.set_timer(pygame.USEREVENT, 0)
+    _paused = True
+    if not _fixed_stepping: pygame.time.set_timer(pygame.USEREVENT, 0)
 
 
 __all__.append('pause')
@@ -675,8 +3089,11 @@ __all__.append('pause')
 
 def unpause():
     """Unpauses the timer; an error if there is no timer to unpause"""
+    global _paused
     if not _timeron: raise Exception("Cannot pause a timer before calling timer_loop(fps, callback)")
-    pygame.time.set_timer(pygame.USEREVENT, int(1000 / _timerfps))
+    _paused = False
+    # only timer_loop runs on the USEREVENT timer; fixed_step_loop just stops counting time while paused
+    if not _fixed_stepping: pygame.time.set_timer(pygame.USEREVENT, int(1000 / _timerfps))
 
 
 __all__.append('unpause')
@@ -689,6 +3106,22 @@ def stop_loop():
 
 __all__.append('stop_loop')
 
+_quit_callbacks = []
+
+
+def on_quit(callback):
+    """Has callback() called whenever a timer_loop, fixed_step_loop, or keys_loop ends because the window was
+    closed, Escape was pressed, or stop_loop was called: the place to finish saving files before the program ends"""
+    if callback not in _quit_callbacks: _quit_callbacks.append(callback)
+
+
+__all__.append('on_quit')
+
+
+def _run_quit_callbacks():
+    for callback in list(_quit_callbacks):
+        callback()
+
 
 def keys_loop(callback):
     """Requests that pygame call the provided function each time a key is pressed
@@ -712,6 +3145,7 @@ def keys_loop(callback):
             callback([event.key])
         if event.type == pygame.MOUSEBUTTONDOWN:
             callback([])
+    _run_quit_callbacks()
 
 
 __all__.append('keys_loop')
@@ -726,25 +3160,42 @@ if __name__ == "__main__":
     b.left += 2
     b.y = 100
     b.move_speed()
+    b.bake_rotations(5)
 
     camera.draw(b)
     camera.display()
 
 
+    logo = "https://www.python.org/static/img/python-logo.png"
+    try:
+        preload([logo])
+        # fetched now rather than in the middle of a tick
+        bake_rotations(logo, 5)
+    except (IOError, OSError, pygame.error):
+        logo = None
+    get_asset_cache().offline = True
+
+    texts = {pygame.K_0: from_text(40, 50, "Type \"1\"", 40, "blue", italic=False, bold=False),
+             pygame.K_1: from_text(40, 50, "Type \"2\"", 40, "green", italic=True, bold=True),
+             pygame.K_2: from_text(40, 50, "Type \"3\"", 40, "white", italic=False, bold=True)}
+    for text in texts.values():
+        text.bake_rotations(5)
+    # every rotation is rendered here, once, so no tick has to
+
+
     def tick(keys):
         global b
         if keys:
-            if pygame.K_0 in keys:
-                b = from_text(40, 50, "Type \"1\"", 40, "blue", italic=False, bold=False)
-            elif pygame.K_1 in keys:
-                b = from_text(40, 50, "Type \"2\"", 40, "green", italic=True, bold=True)
-            elif pygame.K_2 in keys:
-                b = from_text(40, 50, "Type \"3\"", 40, "white", italic=False, bold=True)
-            elif pygame.K_a in keys:
-                stop_loop()
-            elif keys:
-                b.image = "https://www.python.org/static/img/python-logo.png"
-            b.full_size()
+            for key, text in texts.items():
+                if key in keys:
+                    b = text
+                    break
+            else:
+                if pygame.K_a in keys:
+                    stop_loop()
+                elif logo:
+                    b.image = logo
+                    b.full_size()
         b.rotate(-5)
         b.center = camera.mouse
         b.bottom = camera.bottom
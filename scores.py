@@ -0,0 +1,204 @@
+# High score storage for Super Space Shoot.
+# Keeps every finished run in a small sqlite database and the best score of each level in memory.
+
+"""
+Scores used to be appended to super_space_shoot_scores.txt as "level,score" lines and the whole file was read
+again every time a level started. A ScoreStore reads the database once, keeps each level's best score in a dict
+that it updates as scores are added, and writes each score in its own transaction so a crash can't leave half a
+line behind. The old text file is copied in the first time the store is opened.
+With background=True the writing happens on a separate thread, so a slow disk never holds up a frame.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # python2
+
+
+class ScoreStore(object):
+    """Every score saved for every level, with the best score of each level kept in memory
+    ----
+    store = ScoreStore("super_space_shoot_scores.db")
+    store.add("1", 4200)
+    store.high_score("1")  # 4200, without touching the disk
+    store.top("1", 5)  # the five best scores for level 1, best first
+    ----
+    With background=True, add only queues the score; a writer thread saves everything queued in one transaction
+    (which sqlite syncs to disk), retrying if the disk has trouble. flush() waits for the queue to be saved and
+    close() does too, so a clean exit doesn't lose any scores; close is also called when the program exits.
+    Scores the writer gave up on are kept in unsaved and tried again with the next batch and on close; if close
+    still can't save them it raises an exception saying how many were lost."""
+
+    retries = 5
+
+    def __init__(self, filename="super_space_shoot_scores.db", text_file="super_space_shoot_scores.txt",
+                 background=False):
+        """Opens (or makes) the database in filename, bringing in any scores from the old text_file"""
+        self.filename = filename
+        self.unsaved = []
+        # scores the writer thread gave up on after retries failures in a row, to be tried again later
+        self.error = None
+        # the last error the writer thread ran into
+        self._queue = None
+        self._writer = None
+        self._db = sqlite3.connect(filename)
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS scores (level TEXT NOT NULL, score INTEGER NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS level_scores ON scores (level, score DESC)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS migrated (filename TEXT PRIMARY KEY)")
+        self._best = dict(self._db.execute("SELECT level, MAX(score) FROM scores GROUP BY level"))
+        # the best score of each level, loaded once and kept up to date by add
+        if text_file:
+            self.migrate(text_file)
+        if background:
+            self._queue = queue.Queue()
+            self._writer = threading.Thread(target=self._write_queued, name="score writer")
+            self._writer.daemon = True
+            self._writer.start()
+            atexit.register(self.close)
+
+    def migrate(self, text_file):
+        """
+        Copies the scores from an old "level,score" text file into the database, once; lines that can't be read
+        are skipped
+        :param text_file: str name of the text file
+        :return: int number of scores copied
+        """
+        if not os.path.exists(text_file):
+            return 0
+        key = os.path.abspath(text_file)
+        if self._db.execute("SELECT 1 FROM migrated WHERE filename = ?", (key,)).fetchone():
+            return 0
+        rows = []
+        with open(text_file) as f:
+            for line in f:
+                parts = line.strip().split(",")
+                if len(parts) == 2 and parts[1].strip().lstrip("-").isdigit():
+                    rows.append((parts[0], int(parts[1])))
+        with self._db:
+            self._db.executemany("INSERT INTO scores (level, score) VALUES (?, ?)", rows)
+            self._db.execute("INSERT INTO migrated (filename) VALUES (?)", (key,))
+        # the scores and the note that they were copied are saved together or not at all
+        for level, score in rows:
+            if level not in self._best or score > self._best[level]:
+                self._best[level] = score
+        return len(rows)
+
+    def add(self, level, score):
+        """
+        Saves a score for a level
+        :param level: str level name, e.g. "1"
+        :param score: int score
+        :return: nothing
+        """
+        self._check_open()
+        if self._queue is not None:
+            self._queue.put((level, int(score)))
+        else:
+            self._save(self._db, [(level, int(score))])
+        if level not in self._best or score > self._best[level]:
+            self._best[level] = int(score)
+
+    def _check_open(self):
+        if self._db is None: raise Exception("ScoreStore " + self.filename + " has been closed")
+
+    def _save(self, db, records):
+        """inserts records in one transaction, which sqlite syncs to disk before it returns"""
+        with db:
+            db.executemany("INSERT INTO scores (level, score) VALUES (?, ?)", records)
+
+    def _write_queued(self):
+        """the writer thread: saves whatever has been queued, in batches, until close puts None in the queue"""
+        db = sqlite3.connect(self.filename)
+        done = False
+        while not done:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # everything queued while the last batch was saving is saved together
+            records = [record for record in batch if record is not None]
+            done = len(records) < len(batch)
+            records = self.unsaved + records
+            self.unsaved = []
+            # scores given up on before get another chance along with the new ones
+            for attempt in range(self.retries):
+                try:
+                    if records:
+                        self._save(db, records)
+                    break
+                except sqlite3.Error as error:
+                    self.error = error
+                    time.sleep(0.05 * 2 ** attempt)
+            else:
+                self.unsaved.extend(records)
+            for _ in batch:
+                self._queue.task_done()
+        db.close()
+
+    def flush(self):
+        """Waits until every score added so far has been saved"""
+        if self._queue is not None:
+            self._queue.join()
+
+    def high_score(self, level):
+        """
+        :param level: str level name
+        :return: int best score saved for the level, or 0 if there are none
+        """
+        return self._best.get(level, 0)
+
+    def top(self, level, count=10):
+        """
+        :param level: str level name
+        :param count: int how many scores to return
+        :return: a list of the level's best scores, best first
+        """
+        self._check_open()
+        self.flush()
+        rows = self._db.execute("SELECT score FROM scores WHERE level = ? ORDER BY score DESC LIMIT ?",
+                                (level, count))
+        return [score for (score,) in rows]
+
+    def levels(self):
+        """
+        :return: a sorted list of the levels that have scores
+        """
+        return sorted(self._best.keys())
+
+    def close(self):
+        """Saves anything still queued and closes the database; closing again does nothing.
+        Raises an exception if some scores could not be saved even then."""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+            self._queue = None
+        if self._db is None:
+            return
+        lost = []
+        if self.unsaved:
+            try:
+                self._save(self._db, self.unsaved)
+                self.unsaved = []
+            except sqlite3.Error as error:
+                self.error = error
+                lost = self.unsaved
+        self._db.close()
+        self._db = None
+        if lost:
+            raise Exception("%d scores could not be saved to %s: %s" % (len(lost), self.filename, self.error))
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return "ScoreStore " + self.filename + " with scores for " + str(len(self._best)) + " levels"
@@ -0,0 +1,95 @@
+# Checks for gamebox's AssetCache, using file:// urls so nothing touches the network.
+# Run with: python -m pytest test_assets.py  (or python test_assets.py)
+
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import json
+import shutil
+import tempfile
+import unittest
+
+try:
+    from pathlib import Path
+except ImportError:  # python2
+    Path = None
+
+import pygame
+
+import gamebox
+
+
+def file_url(path):
+    """the file:// url of a local file"""
+    if Path is not None: return Path(os.path.abspath(path)).as_uri()
+    return 'file://' + os.path.abspath(path)
+
+
+class AssetCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        if pygame.display.get_surface() is None:
+            pygame.display.set_mode((1, 1))
+            # loading images needs a display to convert them for
+        self.folder = tempfile.mkdtemp()
+        self.cache_folder = os.path.join(self.folder, 'cache')
+        self.old_assets = gamebox.set_asset_cache(gamebox.AssetCache(self.cache_folder))
+        self.old_images = gamebox.set_image_cache(gamebox.ImageCache())
+
+    def tearDown(self):
+        gamebox.set_asset_cache(self.old_assets)
+        gamebox.set_image_cache(self.old_images)
+        shutil.rmtree(self.folder)
+
+    def save_image(self, name, color):
+        """saves a small image filled with color under the test folder and returns its file:// url"""
+        path = os.path.join(self.folder, name)
+        if not os.path.isdir(os.path.dirname(path)): os.makedirs(os.path.dirname(path))
+        image = pygame.Surface((7, 5))
+        image.fill(color)
+        pygame.image.save(image, path)
+        return file_url(path)
+
+    def fresh_offline_cache(self):
+        """a new offline cache on the same folder with an empty image cache, as if the game had been restarted"""
+        gamebox.set_asset_cache(gamebox.AssetCache(self.cache_folder, offline=True))
+        gamebox.set_image_cache(gamebox.ImageCache())
+
+    def test_urls_with_the_same_name_stay_separate(self):
+        red = self.save_image(os.path.join('a', 'logo.png'), (255, 0, 0))
+        blue = self.save_image(os.path.join('b', 'logo.png'), (0, 0, 255))
+        images = gamebox.preload([red, blue])
+        self.assertEqual(tuple(images[0].get_at((0, 0))), (255, 0, 0, 255))
+        self.assertEqual(tuple(images[1].get_at((0, 0))), (0, 0, 255, 255))
+        with open(os.path.join(self.cache_folder, 'manifest.json')) as f:
+            manifest = json.load(f)
+        self.assertNotEqual(manifest[red]['file'], manifest[blue]['file'])
+
+    def test_new_offline_cache_is_served_from_the_manifest(self):
+        url = self.save_image('ship.png', (0, 255, 0))
+        gamebox.preload([url])
+        os.remove(os.path.join(self.folder, 'ship.png'))
+        # the original is gone, so only the cache can supply it
+        self.fresh_offline_cache()
+        box = gamebox.from_image(0, 0, url)
+        self.assertEqual(box.size, (7, 5))
+        self.assertEqual(tuple(box.image.get_at((0, 0))), (0, 255, 0, 255))
+        self.assertEqual(gamebox.get_asset_cache().fetched, 0)
+
+    def test_uncached_url_raises_when_offline(self):
+        url = self.save_image('boom.png', (255, 255, 0))
+        self.fresh_offline_cache()
+        with self.assertRaises(gamebox.OfflineAssetError):
+            gamebox.from_image(0, 0, url)
+        self.assertTrue(issubclass(gamebox.OfflineAssetError, IOError))
+
+    def test_failed_download_leaves_nothing_behind(self):
+        with self.assertRaises((IOError, OSError)):
+            gamebox.preload([file_url(os.path.join(self.folder, 'missing.png'))])
+        self.assertEqual(os.listdir(self.cache_folder), [])
+
+
+if __name__ == "__main__":
+    unittest.main()